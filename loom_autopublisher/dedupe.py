@@ -0,0 +1,173 @@
+"""Single-flight deduplication of publish runs.
+
+Pasting the same Loom URL twice, or two workers picking up one recording,
+must not run the pipeline twice.  :class:`PublishRegistry` keys runs on the
+recording ID from :func:`loom.extract_id`:
+
+* a concurrent request in the same process awaits the in-flight run, which
+  is a registry-owned task: a caller that is cancelled only detaches, and the
+  run is cancelled only once no caller is left waiting;
+* across processes sharing ``state_dir`` an ``flock`` on ``<id>.lock``
+  serialises runs, and the waiter picks up the stored result;
+* a completed run is stored as ``<id>.json`` and later requests return it
+  unless ``force=True``.
+
+Failed runs store nothing, so the next request simply retries.  A run that
+published but could not be stored is still returned (and remembered by this
+registry) rather than failing after the fact.
+"""
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .loom import extract_id
+
+__all__ = ["PublishRegistry"]
+
+log = logging.getLogger(__name__)
+
+
+class PublishRegistry:
+    """Coalesce publish runs per Loom recording ID."""
+
+    def __init__(self, state_dir: Optional[str | Path] = None, *, poll_interval: float = 0.5) -> None:
+        self.state_dir = Path(state_dir or os.getenv("LOOM_STATE_DIR", ".loom-state"))
+        self.poll_interval = poll_interval
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self._unsaved: Dict[str, Dict[str, Any]] = {}  # published, but _store failed
+
+    def _result_path(self, recording_id: str) -> Path:
+        return self.state_dir / f"{recording_id}.json"
+
+    def _load_record(self, recording_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            record = json.loads(self._result_path(recording_id).read_text())
+        except (OSError, ValueError):
+            return None
+        return record if isinstance(record, dict) and "result" in record else None
+
+    def _load(self, recording_id: str) -> Optional[Dict[str, Any]]:
+        if recording_id in self._unsaved:
+            return self._unsaved[recording_id]
+        record = self._load_record(recording_id)
+        return record["result"] if record else None
+
+    def _store(self, recording_id: str, result: Dict[str, Any]) -> None:
+        # encode before touching the disk; a value JSON can't hold is kept as
+        # its str() rather than losing the record of a finished publish
+        data = json.dumps(
+            {"id": recording_id, "completed_at": time.time(), "result": result}, default=str
+        )
+        path = self._result_path(recording_id)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            tmp.write_text(data)
+            tmp.replace(path)  # readers never see a partial file
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def get(self, share_url: str) -> Optional[Dict[str, Any]]:
+        """Return the stored result for ``share_url``, if it was published."""
+        return self._load(extract_id(share_url))
+
+    def forget(self, share_url: str) -> None:
+        """Drop the stored result so the next run publishes again."""
+        recording_id = extract_id(share_url)
+        self._unsaved.pop(recording_id, None)
+        self._result_path(recording_id).unlink(missing_ok=True)
+
+    async def run(
+        self,
+        share_url: str,
+        pipeline: Callable[[], Awaitable[Dict[str, Any]]],
+        *,
+        force: bool = False,
+    ) -> Dict[str, Any]:
+        """Run ``pipeline`` once per recording and return its (JSON-able) result.
+
+        ``force`` republishes even if a stored result exists; it still joins
+        a run that is already in flight rather than starting a second one.
+        """
+        recording_id = extract_id(share_url)
+
+        task = self._inflight.get(recording_id)
+        if task is None:
+            if not force:
+                stored = self._load(recording_id)
+                if stored is not None:
+                    return stored
+            task = asyncio.get_running_loop().create_task(
+                self._run_locked(recording_id, pipeline, force)
+            )
+            self._inflight[recording_id] = task
+            self._waiters[task] = 0
+            task.add_done_callback(lambda t, rid=recording_id: self._finished(rid, t))
+
+        self._waiters[task] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task in self._waiters:
+                self._waiters[task] -= 1
+                if self._waiters[task] == 0 and not task.done():
+                    # last caller gone: nobody wants this run, and the next
+                    # request must start a fresh one rather than join it
+                    self._forget_task(recording_id, task)
+                    task.cancel()
+
+    def _forget_task(self, recording_id: str, task: asyncio.Task) -> None:
+        if self._inflight.get(recording_id) is task:
+            del self._inflight[recording_id]
+        self._waiters.pop(task, None)
+
+    def _finished(self, recording_id: str, task: asyncio.Task) -> None:
+        self._forget_task(recording_id, task)
+        if not task.cancelled():
+            task.exception()  # mark retrieved: callers may all have left
+
+    async def _run_locked(
+        self,
+        recording_id: str,
+        pipeline: Callable[[], Awaitable[Dict[str, Any]]],
+        force: bool,
+    ) -> Dict[str, Any]:
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.state_dir / f"{recording_id}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            requested = time.time()
+            waited = False
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    waited = True  # another process is publishing this recording
+                    await asyncio.sleep(self.poll_interval)
+            record = self._load_record(recording_id)
+            if record is not None:
+                # possibly written by the process we queued behind; a forced
+                # request only accepts a run that finished after it was made
+                if not force or (waited and record.get("completed_at", 0) >= requested):
+                    return record["result"]
+            result = await pipeline()
+            try:
+                self._store(recording_id, result)
+            except (OSError, ValueError) as e:
+                # the publish happened: don't fail it now, and don't let this
+                # process publish it again
+                log.error("could not store publish result for %s: %s", recording_id, e)
+                self._unsaved[recording_id] = result
+            else:
+                self._unsaved.pop(recording_id, None)
+            return result
+        finally:
+            os.close(fd)  # releases the flock
@@ -1,26 +1,50 @@
 """Content generator that turns a Loom transcript into multi-channel copy.
 
-The single public async helper `generate_content` returns a dict with keys:
+The public async helper `generate_content` returns a dict with keys:
     title, description, teaser, slug, walkthrough_html
 
+`generate_variants` adds a ``variants`` list of ranked title/teaser candidates
+for A/B testing, produced by the same single request.
+
 Under the hood this calls OpenAI ChatCompletion with GPT-4o and instructs the
 model to output **valid JSON only**.  Tests patch `openai.ChatCompletion.create`
 so no network call is made.
+
+Prompts are assembled by :mod:`loom_autopublisher.prompt`.  Transcripts that
+would push the request past ``LLM_MAX_PROMPT_TOKENS`` are first condensed
+chunk-by-chunk (in parallel) instead of failing at the API.
 """
 from __future__ import annotations
 
 import asyncio
 import json
+import math
 import os
+import re
+from collections import Counter
 from difflib import get_close_matches
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
 import openai
 
-__all__ = ["generate_content"]
+from .prompt import (
+    build_messages,
+    compact_brand_css,
+    count_message_tokens,
+    count_tokens,
+    split_by_tokens,
+)
+
+__all__ = ["generate_content", "generate_variants"]
 
 _MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+_MAX_PROMPT_TOKENS = int(os.getenv("LLM_MAX_PROMPT_TOKENS", "100000"))
+_MAX_COMPLETION_TOKENS = int(os.getenv("LLM_MAX_COMPLETION_TOKENS", "16384"))
+_CONDENSE_CONCURRENCY = int(os.getenv("LLM_CONDENSE_CONCURRENCY", "4"))
+_CONDENSE_ROUNDS = 2  # condensing a condensed transcript once more is the limit
+_CONDENSE_SLACK = 16  # room for the "Stay under N tokens." suffix
+_MIN_CHUNK_TOKENS = 32
 
 _SYSTEM_PROMPT = (
     "You are a content-marketing assistant. Given a video transcript, "
@@ -35,9 +59,50 @@ _JSON_SCHEMA = (
     '{"title":"string","description":"string","teaser":"string","slug":"string","walkthrough_html":"string"}'
 )
 
+_VARIANT_PROMPT = (
+    "You are a content-marketing assistant. Given a video transcript, "
+    "generate as many distinct candidates as requested by VARIANTS, each with "
+    "a short catchy title (<60 characters) and a 1-sentence teaser (<110 "
+    "characters); vary the angle between candidates. Also generate one "
+    "YouTube description (<150 words) and one kebab-case slug. Then wrap the "
+    "transcript into branded HTML that matches the CSS variables provided.  "
+    "Output ONLY valid JSON with exactly the keys: variants, description, "
+    "slug, walkthrough_html."
+)
+
+_VARIANT_SCHEMA = (
+    '{"variants":[{"title":"string","teaser":"string"}],"description":"string","slug":"string","walkthrough_html":"string"}'
+)
+
+_VARIANT_KEYS = ("title", "teaser")
+
+_LIMITS = {
+    "title": 60,
+    "description": 150 * 8,  # ~150 words × avg 8 chars
+    "teaser": 110,
+    "slug": 100,
+    "walkthrough_html": 1,
+}
+
+_WORD_RE = re.compile(r"[a-z0-9']{4,}")
+_STOPWORDS = frozenset(
+    "this that with from have will your what when then there they them just "
+    "about into here like also some more than very which where these those "
+    "going want make sure okay yeah really".split()
+)
+
+_CONDENSE_PROMPT = (
+    "You condense one segment of a longer video transcript. Keep every step, "
+    "product name, command and number; drop filler words and repetition. "
+    "Output plain text only."
+)
+
 
-async def _arequest(messages):
+async def _arequest(messages, *, json_mode: bool = True, max_tokens: Optional[int] = None):
     """Async thin wrapper because the SDK is sync-only."""
+    kwargs: Dict[str, Any] = {"response_format": {"type": "json_object"}} if json_mode else {}
+    if max_tokens is not None:
+        kwargs["max_tokens"] = max_tokens
     loop = asyncio.get_running_loop()
     return await loop.run_in_executor(
         None,
@@ -45,11 +110,49 @@ async def _arequest(messages):
             model=_MODEL,
             messages=messages,
             temperature=0.7,
-            response_format={"type": "json_object"},
+            **kwargs,
         ),
     )
 
 
+async def _condense_transcript(transcript: str, budget: int) -> str:
+    """Chunked path: condense ``transcript`` so the joined result fits ``budget`` tokens.
+
+    Each chunk gets an equal share of ``budget`` as its output cap, and there
+    are enough chunks that no share exceeds ``LLM_MAX_COMPLETION_TOKENS`` and
+    no chunk exceeds a single condense request.  Chunks are sized evenly, so
+    each one shrinks by the same ratio the whole transcript has to.
+    """
+    prompt_tokens = count_message_tokens([{"content": _CONDENSE_PROMPT}], model=_MODEL)
+    chunk_tokens = _MAX_PROMPT_TOKENS - prompt_tokens - _CONDENSE_SLACK
+    if chunk_tokens < _MIN_CHUNK_TOKENS:
+        raise ValueError("LLM_MAX_PROMPT_TOKENS too small to condense the transcript")
+    total = count_tokens(transcript, model=_MODEL)
+    n = max(math.ceil(total / chunk_tokens), math.ceil(budget / _MAX_COMPLETION_TOKENS), 1)
+    chunks = split_by_tokens(
+        transcript, max(_MIN_CHUNK_TOKENS, min(chunk_tokens, math.ceil(total / n))), model=_MODEL
+    )
+    share = min(budget // len(chunks) - 1, _MAX_COMPLETION_TOKENS)  # -1 for the joining newline
+    if share < _MIN_CHUNK_TOKENS:
+        raise ValueError(
+            f"Transcript too long: {len(chunks)} chunks cannot fit in {budget} prompt tokens"
+        )
+
+    system = f"{_CONDENSE_PROMPT} Stay under {share} tokens."
+    sem = asyncio.Semaphore(_CONDENSE_CONCURRENCY)
+
+    async def condense(chunk: str) -> str:
+        async with sem:
+            rsp = await _arequest(
+                [{"role": "system", "content": system}, {"role": "user", "content": chunk}],
+                json_mode=False,
+                max_tokens=share,
+            )
+        return rsp.choices[0].message.content  # type: ignore[attr-defined]
+
+    return "\n".join(await asyncio.gather(*(condense(c) for c in chunks)))
+
+
 async def generate_content(
     transcript: str,
     *,
@@ -63,45 +166,165 @@ async def generate_content(
     if not transcript.strip():
         raise ValueError("Empty transcript")
 
-    css_vars = "/* brand CSS not found */"
-    if brand_css_path and brand_css_path.exists():
-        css_vars = brand_css_path.read_text()[:2048]  # limit prompt size
+    messages = await _prepare_messages(
+        transcript,
+        brand_css_path=brand_css_path,
+        system_prompt=_SYSTEM_PROMPT,
+        schema=_JSON_SCHEMA,
+    )
+    parsed = await _complete(messages)
+    _check_limits(parsed, _LIMITS)
+    return parsed
 
-    messages = [
-        {"role": "system", "content": _SYSTEM_PROMPT},
-        {"role": "user", "content": f"BRAND_CSS:\n{css_vars}"},
-        {"role": "user", "content": f"TRANSCRIPT:\n{transcript}"},
-        {"role": "user", "content": f"Return JSON matching this schema:\n{_JSON_SCHEMA}"},
-    ]
 
+async def generate_variants(
+    transcript: str,
+    *,
+    n: int = 3,
+    brand_css_path: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """Generate ``n`` title/teaser candidates plus one shared page in one call.
+
+    Returns the same keys as :func:`generate_content` — filled with the
+    best-ranked candidate — plus ``variants``: every valid candidate as
+    ``{"title", "teaser", "score"}`` sorted best first.  Candidates breaking
+    the length limits are dropped; ranking uses a cheap local scorer, no
+    extra LLM calls.
+    """
+    if not transcript.strip():
+        raise ValueError("Empty transcript")
+    if n < 1:
+        raise ValueError("n must be >= 1")
+
+    messages = await _prepare_messages(
+        transcript,
+        brand_css_path=brand_css_path,
+        system_prompt=_VARIANT_PROMPT,
+        schema=_VARIANT_SCHEMA,
+        # Variable part goes last so the cached prefix is shared across any n.
+        extra=[{"role": "user", "content": f"VARIANTS: {n}"}],
+    )
+    parsed = await _complete(messages)
+    _check_limits(parsed, {k: v for k, v in _LIMITS.items() if k not in _VARIANT_KEYS})
+
+    raw = parsed.pop("variants", None)
+    if not isinstance(raw, list):
+        raise KeyError("Missing key variants in LLM output")
+    keywords = _keywords(transcript)
+    seen = set()
+    ranked = []
+    for cand in raw[:n]:
+        if not isinstance(cand, dict):
+            continue
+        try:
+            _check_limits(cand, {k: _LIMITS[k] for k in _VARIANT_KEYS})
+        except (KeyError, ValueError, TypeError):
+            continue
+        dedupe_key = cand["title"].strip().lower()
+        if dedupe_key in seen:
+            continue
+        seen.add(dedupe_key)
+        variant = {k: cand[k] for k in _VARIANT_KEYS}
+        variant["score"] = _score_variant(variant, keywords)
+        ranked.append(variant)
+    if not ranked:
+        raise ValueError("LLM returned no variant within length limits")
+
+    ranked.sort(key=lambda v: v["score"], reverse=True)
+    parsed.update({k: ranked[0][k] for k in _VARIANT_KEYS})
+    parsed["variants"] = ranked
+    return parsed
+
+
+async def _prepare_messages(
+    transcript: str,
+    *,
+    brand_css_path: Optional[Path],
+    system_prompt: str,
+    schema: str,
+    extra: Sequence[Dict[str, str]] = (),
+) -> List[Dict[str, str]]:
+    """Build messages (``extra`` appended last), condensing the transcript if over budget."""
+    css_vars = compact_brand_css(brand_css_path)
+
+    def build(text: str) -> List[Dict[str, str]]:
+        return build_messages(
+            text, system_prompt=system_prompt, schema=schema, brand_css=css_vars
+        ) + list(extra)
+
+    messages = build(transcript)
+    if count_message_tokens(messages, model=_MODEL) <= _MAX_PROMPT_TOKENS:
+        return messages
+
+    # everything but the transcript itself: the other messages plus its label
+    fixed = messages[: -1 - len(extra)] + list(extra)
+    prefix = count_message_tokens(fixed, model=_MODEL) + count_message_tokens(
+        [{"content": "TRANSCRIPT:\n"}], model=_MODEL
+    )
+    if prefix >= _MAX_PROMPT_TOKENS:
+        raise ValueError(
+            f"Prompt prefix alone is {prefix} tokens; LLM_MAX_PROMPT_TOKENS={_MAX_PROMPT_TOKENS}"
+        )
+    for _ in range(_CONDENSE_ROUNDS):
+        transcript = await _condense_transcript(transcript, _MAX_PROMPT_TOKENS - prefix)
+        messages = build(transcript)
+        total = count_message_tokens(messages, model=_MODEL)
+        if total <= _MAX_PROMPT_TOKENS:
+            return messages
+    raise ValueError(
+        f"Transcript still {total} prompt tokens after condensing; "
+        f"LLM_MAX_PROMPT_TOKENS={_MAX_PROMPT_TOKENS}"
+    )
+
+
+async def _complete(messages) -> Dict[str, Any]:
+    """Send ``messages`` and parse the JSON object in the reply."""
     rsp = await _arequest(messages)
     txt = rsp.choices[0].message.content  # type: ignore[attr-defined]
     try:
-        parsed = json.loads(txt)
+        return json.loads(txt)
     except json.JSONDecodeError as e:
         # Attempt to recover by finding the closest braces block
         start = txt.find("{")
         end = txt.rfind("}")
         if start != -1 and end != -1:
-            parsed = json.loads(txt[start : end + 1])
-        else:
-            raise RuntimeError("LLM returned non-JSON") from e
-
-    # Basic sanity checks
-    required = {
-        "title": 60,
-        "description": 150 * 8,  # ~150 words × avg 8 chars
-        "teaser": 110,
-        "slug": 100,
-        "walkthrough_html": 1,
-    }
-    for key, limit in required.items():
+            return json.loads(txt[start : end + 1])
+        raise RuntimeError("LLM returned non-JSON") from e
+
+
+def _check_limits(parsed: Dict[str, Any], limits: Dict[str, int]) -> None:
+    """Basic sanity checks: every key present and within its length limit."""
+    for key, limit in limits.items():
         if key not in parsed:
             raise KeyError(f"Missing key {key} in LLM output")
-        if key in ("walkthrough_html"):
+        if key == "walkthrough_html":
             continue
         if len(parsed[key]) > limit:
             close = get_close_matches(key, parsed.keys())
             raise ValueError(f"{key} too long; got {len(parsed[key])} chars. keys: {close}")
 
-    return parsed
+
+def _words(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def _keywords(transcript: str, k: int = 10) -> List[str]:
+    """Most frequent content words of the transcript."""
+    return [w for w, _ in Counter(_words(transcript)).most_common(k)]
+
+
+def _score_variant(variant: Dict[str, str], keywords: List[str]) -> float:
+    """Cheap local score in [0, 1]: topic coverage, length fit and novelty."""
+    title_words = set(_words(variant["title"]))
+    teaser_words = set(_words(variant["teaser"]))
+    both = title_words | teaser_words
+    coverage = sum(1 for w in keywords if w in both) / len(keywords) if keywords else 0.0
+
+    fit = 0.0
+    for key in _VARIANT_KEYS:
+        ideal = 0.75 * _LIMITS[key]  # use most of the room without crowding it
+        fit += max(0.0, 1 - abs(len(variant[key]) - ideal) / ideal) / len(_VARIANT_KEYS)
+
+    # a teaser that only repeats the title wastes the second line
+    overlap = len(title_words & teaser_words) / len(both) if both else 1.0
+    return round(0.5 * coverage + 0.3 * fit + 0.2 * (1 - overlap), 3)
@@ -0,0 +1,246 @@
+"""Opt-in per-run resource profiling (CPU, peak RSS, bytes in/out).
+
+Wrap each pipeline stage and write one JSON report per run::
+
+    prof = RunProfiler(recording_id)          # active when LOOM_PROFILE=1
+    with prof.stage("fetch_assets"):
+        client = httpx.AsyncClient(event_hooks=prof.httpx_event_hooks("loom"))
+        assets = await fetch_assets(url, client=client)
+    prof.write_report()                       # <LOOM_PROFILE_DIR>/<run_id>.json
+
+With ``detail="cprofile"`` or ``"tracemalloc"`` (``LOOM_PROFILE_DETAIL``) the
+report also keeps the top entries for the slowest stage, which is where
+whole-file buffering such as ``fetch_assets``' video bytes shows up.
+:func:`format_report` renders a report for the Streamlit log pane, and
+``python -m loom_autopublisher.profiling REPORT.json`` prints it on the CLI.
+
+When profiling is off every hook is a no-op.
+"""
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource  # POSIX only
+except ImportError:  # graceful degradation: no peak RSS on Windows
+    resource = None  # type: ignore
+
+__all__ = ["RunProfiler", "format_report"]
+
+_TOP_N = 15
+# ru_maxrss is KiB on Linux, bytes on macOS
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+# cProfile and tracemalloc are process-global: at most one detail capture at a
+# time across every RunProfiler (concurrent runs just skip the detail).
+_DETAIL_LOCK = threading.Lock()
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").lower() in ("1", "true", "yes", "on")
+
+
+def _peak_rss() -> int:
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT
+
+
+class RunProfiler:
+    """Collect per-stage resource usage for a single pipeline run."""
+
+    def __init__(
+        self,
+        run_id: str,
+        *,
+        enabled: Optional[bool] = None,
+        detail: Optional[str] = None,
+        report_dir: Optional[str | Path] = None,
+    ) -> None:
+        self.run_id = run_id
+        self.enabled = _env_flag("LOOM_PROFILE") if enabled is None else enabled
+        self.detail = detail if detail is not None else os.getenv("LOOM_PROFILE_DETAIL") or None
+        if self.detail not in (None, "cprofile", "tracemalloc"):
+            raise ValueError(f"unknown profiling detail {self.detail!r}")
+        self.report_dir = Path(
+            report_dir or os.getenv("LOOM_PROFILE_DIR", os.path.join(".loom-state", "profiles"))
+        )
+        self.started_at = time.time()
+        self.stages: List[Dict[str, Any]] = []
+        self.io: Dict[str, Dict[str, int]] = {}
+        self.slowest: Optional[Dict[str, Any]] = None
+
+    # ------------------------------------------------------------------
+    # hooks
+    # ------------------------------------------------------------------
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Measure the enclosed block as pipeline stage ``name``.
+
+        CPU time is process-wide, so concurrently running stages each see the
+        other's CPU; wall time and peak-RSS growth are still per stage.  Only
+        one stage in the process captures ``detail`` at a time.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        capture = self.detail if self.detail and _DETAIL_LOCK.acquire(blocking=False) else None
+        profiler = snapshot = None
+        started_tracing = False
+        if capture:
+            try:
+                if capture == "cprofile":
+                    profiler = cProfile.Profile()
+                    profiler.enable()
+                else:
+                    started_tracing = not tracemalloc.is_tracing()
+                    if started_tracing:
+                        tracemalloc.start()
+                    snapshot = tracemalloc.take_snapshot()
+            except Exception:
+                # e.g. another (non-RunProfiler) profiler is active; the
+                # detail is optional, the stage itself must still run
+                if started_tracing:
+                    tracemalloc.stop()
+                profiler = snapshot = None
+                capture = None
+                _DETAIL_LOCK.release()
+
+        rss0 = _peak_rss()
+        cpu0 = time.process_time()
+        wall0 = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            wall = time.perf_counter() - wall0
+            record = {
+                "stage": name,
+                "ok": ok,
+                "wall_s": round(wall, 4),
+                "cpu_s": round(time.process_time() - cpu0, 4),
+                "peak_rss_delta": _peak_rss() - rss0,
+            }
+            self.stages.append(record)
+
+            if capture:
+                text = None
+                try:
+                    if profiler is not None:
+                        profiler.disable()
+                        buf = io.StringIO()
+                        pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(_TOP_N)
+                        text = buf.getvalue()
+                    else:
+                        diff = tracemalloc.take_snapshot().compare_to(snapshot, "lineno")[:_TOP_N]
+                        text = "\n".join(str(d) for d in diff)
+                except Exception as e:  # never fail (or mask) the stage itself
+                    text = f"{capture} capture failed: {e}"
+                finally:
+                    if started_tracing:
+                        tracemalloc.stop()
+                    _DETAIL_LOCK.release()
+                if self.slowest is None or wall > self.slowest["wall_s"]:
+                    self.slowest = {"stage": name, "wall_s": record["wall_s"], "detail": capture, "text": text}
+
+    def record_io(self, service: str, *, downloaded: int = 0, uploaded: int = 0) -> None:
+        """Add ``downloaded``/``uploaded`` byte counts for ``service``."""
+        if not self.enabled:
+            return
+        counts = self.io.setdefault(service, {"downloaded": 0, "uploaded": 0})
+        counts["downloaded"] += downloaded
+        counts["uploaded"] += uploaded
+
+    def httpx_event_hooks(self, service: str) -> Dict[str, list]:
+        """Return ``event_hooks`` for ``httpx.AsyncClient`` counting bytes by Content-Length."""
+        if not self.enabled:
+            return {}
+
+        async def on_request(request) -> None:
+            self.record_io(service, uploaded=int(request.headers.get("content-length", 0)))
+
+        async def on_response(response) -> None:
+            self.record_io(service, downloaded=int(response.headers.get("content-length", 0)))
+
+        return {"request": [on_request], "response": [on_response]}
+
+    # ------------------------------------------------------------------
+    # output
+    # ------------------------------------------------------------------
+    def report(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "wall_s": round(time.time() - self.started_at, 4),
+            "stages": self.stages,
+            "io": self.io,
+            "slowest": self.slowest,
+        }
+
+    def write_report(self) -> Optional[Path]:
+        """Write ``<report_dir>/<run_id>.json`` and return its path (None if disabled)."""
+        if not self.enabled:
+            return None
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        path = self.report_dir / f"{self.run_id}.json"
+        path.write_text(json.dumps(self.report(), indent=2))
+        return path
+
+
+def _fmt_bytes(n: float) -> str:
+    if abs(n) < 1024:
+        return f"{n:.0f} B"
+    for unit in ("KB", "MB", "GB"):
+        n /= 1024
+        if abs(n) < 1024 or unit == "GB":
+            break
+    return f"{n:.1f} {unit}"
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Render a report dict as a plain-text table."""
+    lines = [f"run {report['run_id']}  wall {report['wall_s']:.2f}s"]
+    lines.append(f"{'stage':<20} {'wall':>8} {'cpu':>8} {'peak rss':>10}")
+    for s in report["stages"]:
+        flag = "" if s["ok"] else "  ❌"
+        lines.append(
+            f"{s['stage']:<20} {s['wall_s']:>7.2f}s {s['cpu_s']:>7.2f}s "
+            f"{'+' + _fmt_bytes(s['peak_rss_delta']):>10}{flag}"
+        )
+    for service, counts in sorted(report["io"].items()):
+        lines.append(
+            f"io {service}: ↓ {_fmt_bytes(counts['downloaded'])}  ↑ {_fmt_bytes(counts['uploaded'])}"
+        )
+    slowest = report.get("slowest")
+    if slowest and slowest.get("text"):
+        lines.append(f"\n{slowest['detail']} for slowest stage {slowest['stage']}:")
+        lines.append(slowest["text"].rstrip())
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    paths = sys.argv[1:] if argv is None else argv
+    if not paths:
+        print("usage: python -m loom_autopublisher.profiling REPORT.json [...]", file=sys.stderr)
+        return 2
+    for p in paths:
+        print(format_report(json.loads(Path(p).read_text())))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
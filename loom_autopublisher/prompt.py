@@ -0,0 +1,184 @@
+"""Prompt assembly helpers for the content generator.
+
+Keeps the LLM prompt small and cache-friendly:
+
+* ``compact_brand_css`` parses ``variables.css`` once, keeps only the palette /
+  typography custom properties and caches the result keyed by file mtime.
+* ``build_messages`` orders messages so the stable prefix (instructions,
+  schema, brand CSS) comes first and the per-video transcript last, which lets
+  provider-side prompt caching reuse the prefix across runs.
+* ``count_tokens`` / ``count_message_tokens`` give a pre-flight token estimate
+  so oversized transcripts can be chunked instead of failing at the API.
+  *tiktoken* is optional: it fetches BPE files on first use, so without it
+  (and in CI) a chars/4 estimate is used.
+"""
+from __future__ import annotations
+
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import tiktoken  # type: ignore
+except ImportError:  # graceful degradation: fall back to a char heuristic
+    tiktoken = None  # type: ignore
+
+__all__ = [
+    "compact_brand_css",
+    "build_messages",
+    "count_tokens",
+    "count_message_tokens",
+    "split_by_tokens",
+]
+
+_CSS_MISSING = "/* brand CSS not found */"
+_CSS_CHAR_LIMIT = 2048
+
+# Custom-property names containing any of these fragments describe the brand
+# palette or typography; everything else (z-indexes, breakpoints, ...) is noise
+# for the model.
+_RELEVANT_FRAGMENTS = (
+    "color",
+    "colour",
+    "brand",
+    "primary",
+    "secondary",
+    "accent",
+    "bg",
+    "background",
+    "fg",
+    "text",
+    "font",
+    "heading",
+    "line-height",
+    "letter-spacing",
+    "radius",
+)
+
+_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_PROP_RE = re.compile(r"--([A-Za-z0-9_-]+)\s*:\s*([^;}]+)")
+
+# (resolved path) -> ((mtime_ns, size), compacted css)
+_CSS_CACHE: Dict[Path, Tuple[Tuple[int, int], str]] = {}
+
+# Per-message framing overhead used by OpenAI chat models.
+_MSG_OVERHEAD = 4
+
+
+def _parse_custom_properties(css: str) -> Dict[str, str]:
+    """Return ``{name: value}`` for every ``--custom-property`` in ``css``."""
+    css = _COMMENT_RE.sub("", css)
+    props: Dict[str, str] = {}
+    for name, value in _PROP_RE.findall(css):
+        props[name] = " ".join(value.split())
+    return props
+
+
+def compact_brand_css(path: Optional[Path]) -> str:
+    """Return a compact ``:root{...}`` block with the relevant brand variables.
+
+    Results are cached per file and invalidated when its mtime or size
+    changes, so repeated runs never re-read an unchanged stylesheet.
+    """
+    if path is None:
+        return _CSS_MISSING
+    try:
+        st = path.stat()
+    except OSError:
+        return _CSS_MISSING
+
+    key = path.resolve()
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _CSS_CACHE.get(key)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    props = _parse_custom_properties(path.read_text(errors="ignore"))
+    relevant = {
+        k: v for k, v in props.items() if any(f in k.lower() for f in _RELEVANT_FRAGMENTS)
+    }
+    # Unconventional naming: better to send everything than nothing.
+    chosen = relevant or props
+    if chosen:
+        body = ";".join(f"--{k}:{v}" for k, v in chosen.items())
+        compact = f":root{{{body}}}"
+    else:
+        compact = _COMMENT_RE.sub("", path.read_text(errors="ignore")).strip()
+    compact = compact[:_CSS_CHAR_LIMIT]  # hard cap on prompt size
+
+    _CSS_CACHE[key] = (stamp, compact)
+    return compact
+
+
+def build_messages(
+    transcript: str,
+    *,
+    system_prompt: str,
+    schema: str,
+    brand_css: str,
+) -> List[Dict[str, str]]:
+    """Return chat messages with the stable prefix first.
+
+    Instructions and schema are merged into a single system message and the
+    brand CSS follows, so everything up to the transcript is byte-identical
+    between runs and eligible for provider prompt caching.
+    """
+    return [
+        {
+            "role": "system",
+            "content": f"{system_prompt}\n\nReturn JSON matching this schema:\n{schema}",
+        },
+        {"role": "user", "content": f"BRAND_CSS:\n{brand_css}"},
+        {"role": "user", "content": f"TRANSCRIPT:\n{transcript}"},
+    ]
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, *, model: Optional[str] = None) -> int:
+    """Return the token count of ``text`` (≈ chars/4 without *tiktoken*)."""
+    if tiktoken is None:
+        return len(text) // 4 + 1
+    model = model or os.getenv("LLM_MODEL", "gpt-4o-mini")
+    return len(_encoding(model).encode(text))
+
+
+def count_message_tokens(messages: List[Dict[str, str]], *, model: Optional[str] = None) -> int:
+    """Return the approximate prompt size of a chat ``messages`` list."""
+    return sum(count_tokens(m["content"], model=model) + _MSG_OVERHEAD for m in messages)
+
+
+def split_by_tokens(text: str, max_tokens: int, *, model: Optional[str] = None) -> List[str]:
+    """Split ``text`` on line boundaries into chunks of at most ``max_tokens``.
+
+    A single line longer than the budget is hard-split by characters.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    used = 0
+    for line in text.splitlines(keepends=True):
+        n = count_tokens(line, model=model)
+        if n > max_tokens:
+            # pathological line (e.g. transcript without newlines)
+            step = max(1, len(line) * max_tokens // n)
+            pieces = [line[i : i + step] for i in range(0, len(line), step)]
+        else:
+            pieces = [line]
+        for piece in pieces:
+            n = count_tokens(piece, model=model)
+            if current and used + n > max_tokens:
+                chunks.append("".join(current))
+                current, used = [], 0
+            current.append(piece)
+            used += n
+    if current:
+        chunks.append("".join(current))
+    return chunks
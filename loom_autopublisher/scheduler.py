@@ -0,0 +1,233 @@
+"""Priority + fairness scheduler in front of the pipeline stages.
+
+Every stage (``generate_content``, ``upload_video``, ``generate_intro``, ...)
+has its own concurrency cap, so a 300-URL backfill cannot take all LLM,
+upload or HeyGen capacity.  Within a stage:
+
+* the ``interactive`` lane (URLs pasted into the UI) is always served first,
+  FIFO, and backfill may only hold ``backfill_cap`` of the stage's slots
+  (default ``cap - 1``), so an interactive job never waits behind a full
+  stage of long backfill jobs and stays near the 6-minute SLA under load;
+* the ``backfill`` lane is served round-robin across ``tenant`` keys (one per
+  backfill batch), so concurrent backfills share capacity fairly.
+
+Usage::
+
+    sched = Scheduler()
+    content = await sched.submit("generate_content", generate_content, transcript)
+    yt_url = await sched.submit("upload_video", upload_video, video, title=t,
+                                description=d, lane="backfill", tenant="batch-7")
+
+Caps default to ``DEFAULT_CAPS`` and can be overridden per stage with
+``LOOM_CAP_<STAGE>`` (e.g. ``LOOM_CAP_UPLOAD_VIDEO=4``); backfill caps with
+``backfill_caps=`` or ``LOOM_BACKFILL_CAP_<STAGE>``.  A stage capped at 1
+cannot reserve a slot, so backfill then shares it.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Mapping, Optional, Set, Tuple
+
+__all__ = ["Scheduler", "DEFAULT_CAPS", "INTERACTIVE", "BACKFILL"]
+
+INTERACTIVE = "interactive"
+BACKFILL = "backfill"
+
+DEFAULT_CAPS: Dict[str, int] = {
+    "generate_content": 4,
+    "upload_video": 2,
+    "generate_intro": 2,
+}
+
+class _Job:
+    """One queued call; compared by identity so it can be dropped from a queue."""
+
+    __slots__ = ("fn", "args", "kwargs", "fut", "lane", "tenant")
+
+    def __init__(self, fn, args, kwargs, fut, lane, tenant) -> None:
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.fut: asyncio.Future = fut
+        self.lane = lane
+        self.tenant = tenant
+
+
+class _StagePool:
+    """Queues and running counts for one stage.
+
+    ``backfill_cap`` bounds how many slots backfill may hold, so the rest of
+    ``cap`` is always free for interactive jobs.
+    """
+
+    def __init__(self, cap: int, backfill_cap: int) -> None:
+        if cap < 1:
+            raise ValueError("stage cap must be >= 1")
+        if not 1 <= backfill_cap <= cap:
+            raise ValueError("backfill cap must be between 1 and the stage cap")
+        self.cap = cap
+        self.backfill_cap = backfill_cap
+        self.running = 0
+        self.running_backfill = 0
+        self.interactive: Deque[_Job] = deque()
+        self.backfill: "OrderedDict[str, Deque[_Job]]" = OrderedDict()
+
+    def push(self, job: _Job) -> None:
+        if job.lane == INTERACTIVE:
+            self.interactive.append(job)
+        else:
+            self.backfill.setdefault(job.tenant, deque()).append(job)
+
+    def discard(self, job: _Job) -> None:
+        """Drop ``job`` if it is still queued (its caller was cancelled)."""
+        queue = self.interactive if job.lane == INTERACTIVE else self.backfill.get(job.tenant)
+        if queue is None:
+            return
+        try:
+            queue.remove(job)
+        except ValueError:
+            return  # already running
+        if job.lane == BACKFILL and not queue:
+            del self.backfill[job.tenant]
+
+    def pop(self) -> Optional[_Job]:
+        if self.running >= self.cap:
+            return None
+        if self.interactive:
+            return self.interactive.popleft()
+        if self.backfill and self.running_backfill < self.backfill_cap:
+            tenant, queue = next(iter(self.backfill.items()))
+            job = queue.popleft()
+            if queue:
+                self.backfill.move_to_end(tenant)  # round-robin between tenants
+            else:
+                del self.backfill[tenant]
+            return job
+        return None
+
+    def queued(self) -> Tuple[int, int]:
+        return len(self.interactive), sum(len(q) for q in self.backfill.values())
+
+
+class Scheduler:
+    """Route stage calls through capped, prioritised per-stage pools."""
+
+    def __init__(
+        self,
+        caps: Optional[Mapping[str, int]] = None,
+        *,
+        backfill_caps: Optional[Mapping[str, int]] = None,
+        default_cap: int = 1,
+    ) -> None:
+        self._caps = dict(DEFAULT_CAPS)
+        self._caps.update(caps or {})
+        self._backfill_caps = dict(backfill_caps or {})
+        self.default_cap = default_cap
+        self._pools: Dict[str, _StagePool] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def cap(self, stage: str) -> int:
+        env = os.getenv(f"LOOM_CAP_{stage.upper()}")
+        if env:
+            return int(env)
+        return self._caps.get(stage, self.default_cap)
+
+    def backfill_cap(self, stage: str) -> int:
+        env = os.getenv(f"LOOM_BACKFILL_CAP_{stage.upper()}")
+        if env:
+            return int(env)
+        return self._backfill_caps.get(stage, max(1, self.cap(stage) - 1))
+
+    def _pool(self, stage: str) -> _StagePool:
+        pool = self._pools.get(stage)
+        if pool is None:
+            pool = self._pools[stage] = _StagePool(self.cap(stage), self.backfill_cap(stage))
+        return pool
+
+    async def submit(
+        self,
+        stage: str,
+        fn: Callable[..., Awaitable[Any]],
+        *args: Any,
+        lane: str = INTERACTIVE,
+        tenant: str = "default",
+        **kwargs: Any,
+    ) -> Any:
+        """Run ``await fn(*args, **kwargs)`` once ``stage`` has a free slot.
+
+        Cancelling the caller drops a queued job or cancels a running one.
+        """
+        if lane not in (INTERACTIVE, BACKFILL):
+            raise ValueError(f"unknown lane {lane!r}")
+        fut = asyncio.get_running_loop().create_future()
+        pool = self._pool(stage)
+        job = _Job(fn, args, kwargs, fut, lane, tenant)
+        pool.push(job)
+        fut.add_done_callback(lambda f: pool.discard(job) if f.cancelled() else None)
+        self._pump(pool)
+        return await fut
+
+    def wrap(
+        self,
+        stage: str,
+        fn: Callable[..., Awaitable[Any]],
+        *,
+        lane: str = INTERACTIVE,
+        tenant: str = "default",
+    ) -> Callable[..., Awaitable[Any]]:
+        """Return ``fn`` bound to ``stage``/``lane`` so call sites stay unchanged."""
+
+        async def scheduled(*args: Any, **kwargs: Any) -> Any:
+            return await self.submit(stage, fn, *args, lane=lane, tenant=tenant, **kwargs)
+
+        return scheduled
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return ``{stage: {cap, backfill_cap, running, interactive, backfill}}`` for the UI."""
+        out = {}
+        for stage, pool in self._pools.items():
+            interactive, backfill = pool.queued()
+            out[stage] = {
+                "cap": pool.cap,
+                "backfill_cap": pool.backfill_cap,
+                "running": pool.running,
+                "interactive": interactive,
+                "backfill": backfill,
+            }
+        return out
+
+    def _pump(self, pool: _StagePool) -> None:
+        while True:
+            job = pool.pop()
+            if job is None:
+                return
+            if job.fut.done():  # cancelled between discard and pop
+                continue
+            pool.running += 1
+            if job.lane == BACKFILL:
+                pool.running_backfill += 1
+            task = asyncio.get_running_loop().create_task(self._run(pool, job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            job.fut.add_done_callback(lambda f, t=task: t.cancel() if f.cancelled() else None)
+
+    async def _run(self, pool: _StagePool, job: _Job) -> None:
+        fut = job.fut
+        try:
+            result = await job.fn(*job.args, **job.kwargs)
+        except asyncio.CancelledError:
+            if not fut.done():
+                fut.cancel()
+        except Exception as e:
+            if not fut.done():
+                fut.set_exception(e)
+        else:
+            if not fut.done():
+                fut.set_result(result)
+        finally:
+            pool.running -= 1
+            if job.lane == BACKFILL:
+                pool.running_backfill -= 1
+            self._pump(pool)
@@ -0,0 +1,217 @@
+"""Per-platform social fan-out on top of :func:`buffer.queue_post`.
+
+The HeyGen Short and teaser go to TikTok, Instagram Reels, X and LinkedIn.
+Each platform gets its own caption variant and the media is checked against
+that platform's limits *before* anything is sent.  Profiles are posted
+concurrently, one Buffer call each, so a rejected platform neither delays
+nor fails the others: `fan_out` returns a :class:`PostResult` per profile.
+
+Limits below are conservative published values for API uploads; adjust
+`PLATFORMS` if a provider changes them.
+"""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional
+
+from .buffer import queue_post
+
+__all__ = [
+    "PlatformSpec",
+    "MediaInfo",
+    "PostResult",
+    "PLATFORMS",
+    "build_caption",
+    "check_media",
+    "fan_out",
+]
+
+_SEP = " ▶ "  # queue_post joins caption and link with this
+_MIN_CAPTION = 10  # below this a caption is meaningless
+
+
+@dataclass(frozen=True)
+class PlatformSpec:
+    """Caption and media constraints for one social platform."""
+
+    name: str
+    max_caption: int
+    min_duration: float
+    max_duration: float
+    min_aspect: float  # width / height
+    max_aspect: float
+    max_bytes: int
+    hashtags: bool = False
+    link_length: Optional[int] = None  # fixed length links count as (X: t.co)
+
+
+@dataclass(frozen=True)
+class MediaInfo:
+    """Properties of the video to post (seconds, pixels, bytes)."""
+
+    duration: float
+    width: int
+    height: int
+    size: int
+
+
+@dataclass
+class PostResult:
+    """Outcome of posting to a single Buffer profile."""
+
+    profile_id: str
+    platform: str
+    update_id: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.update_id is not None
+
+
+_MB = 1024 * 1024
+
+PLATFORMS: Dict[str, PlatformSpec] = {
+    "tiktok": PlatformSpec("tiktok", 2200, 3, 600, 0.5, 0.6, 287 * _MB, hashtags=True),
+    "instagram": PlatformSpec("instagram", 2200, 3, 90, 0.5, 0.8, 1024 * _MB, hashtags=True),
+    "x": PlatformSpec("x", 280, 0.5, 140, 1 / 2.39, 2.39, 512 * _MB, link_length=23),
+    "linkedin": PlatformSpec("linkedin", 3000, 3, 600, 1 / 2.4, 2.4, 5 * 1024 * _MB),
+}
+
+
+def _truncate(text: str, limit: int) -> str:
+    """Cut ``text`` to ``limit`` chars on a word boundary, adding an ellipsis."""
+    if len(text) <= limit:
+        return text
+    if limit <= 1:
+        return text[:limit]
+    cut = text[: limit - 1]
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip(" ,.;:-") + "…"
+
+
+def build_caption(
+    platform: str,
+    *,
+    teaser: str,
+    netlify_url: str,
+    description: str = "",
+    slug: str = "",
+) -> str:
+    """Return the caption for ``platform`` (without the link queue_post appends).
+
+    LinkedIn gets the teaser plus the description's first paragraph, TikTok
+    and Reels get hashtags derived from the slug, X gets the bare teaser.
+    The result always fits once ``" ▶ " + netlify_url`` is appended; raises
+    ``ValueError`` if the link alone leaves no room for a caption.
+    """
+    spec = PLATFORMS[platform]
+    link = spec.link_length if spec.link_length is not None else len(netlify_url)
+    budget = spec.max_caption - len(_SEP) - link
+    if budget < _MIN_CAPTION:
+        raise ValueError(f"link too long for a {platform} caption ({link} chars)")
+
+    text = teaser.strip()
+    if platform == "linkedin" and description.strip():
+        lead = description.strip().split("\n\n")[0]
+        text = f"{text}\n\n{lead}"
+    if spec.hashtags and slug:
+        tags = " ".join([f"#{w}" for w in slug.split("-") if len(w) >= 3][:5])
+        if tags and len(text) + 2 + len(tags) <= budget:
+            return f"{text}\n\n{tags}"
+    return _truncate(text, budget)
+
+
+def check_media(platform: str, media: MediaInfo) -> List[str]:
+    """Return human-readable problems with ``media`` for ``platform`` (empty = ok)."""
+    spec = PLATFORMS[platform]
+    problems = []
+    if not spec.min_duration <= media.duration <= spec.max_duration:
+        problems.append(
+            f"duration {media.duration:g}s outside {spec.min_duration:g}-{spec.max_duration:g}s"
+        )
+    aspect = media.width / media.height if media.height else 0.0
+    if not spec.min_aspect - 0.01 <= aspect <= spec.max_aspect + 0.01:
+        problems.append(f"aspect {media.width}x{media.height} not accepted")
+    if media.size > spec.max_bytes:
+        problems.append(f"size {media.size} bytes over {spec.max_bytes}")
+    return problems
+
+
+async def _post_one(
+    profile_id: str,
+    platform: str,
+    *,
+    teaser: str,
+    netlify_url: str,
+    description: str,
+    slug: str,
+    remote_video_url: Optional[str],
+    media: Optional[MediaInfo],
+    dry_run: bool,
+) -> PostResult:
+    result = PostResult(profile_id=profile_id, platform=platform)
+    if platform not in PLATFORMS:
+        result.error = f"unknown platform {platform!r}"
+        return result
+    if remote_video_url:
+        if media is None:
+            result.error = "media unknown: pass media to check it before posting"
+            return result
+        problems = check_media(platform, media)
+        if problems:
+            result.error = "; ".join(problems)
+            return result
+    try:
+        caption = build_caption(
+            platform, teaser=teaser, netlify_url=netlify_url, description=description, slug=slug
+        )
+        result.update_id = await queue_post(
+            text=caption,
+            netlify_url=netlify_url,
+            remote_video_url=remote_video_url,
+            profiles=[profile_id],
+            dry_run=dry_run,
+        )
+    except Exception as e:  # any failure is this profile's alone
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
+
+async def fan_out(
+    profiles: Mapping[str, str],
+    *,
+    teaser: str,
+    netlify_url: str,
+    description: str = "",
+    slug: str = "",
+    remote_video_url: Optional[str] = None,
+    media: Optional[MediaInfo] = None,
+    dry_run: bool = False,
+) -> Dict[str, PostResult]:
+    """Post to every ``{profile_id: platform}`` concurrently.
+
+    ``media`` describes the video at ``remote_video_url`` and is required
+    with it: each profile's limits are checked first, and violating profiles
+    (or every profile, if ``media`` is missing) are reported as errors
+    without a Buffer call.  Never raises for a single profile.
+    """
+    results = await asyncio.gather(
+        *(
+            _post_one(
+                pid,
+                platform.lower(),
+                teaser=teaser,
+                netlify_url=netlify_url,
+                description=description,
+                slug=slug,
+                remote_video_url=remote_video_url,
+                media=media,
+                dry_run=dry_run,
+            )
+            for pid, platform in profiles.items()
+        )
+    )
+    return {r.profile_id: r for r in results}
@@ -2,7 +2,8 @@
 # Live snapshot every time a file changes (macOS/Linux).
 repo_root="$(git rev-parse --show-toplevel)"
 fswatch -o "$repo_root" | while read; do
-  python "$repo_root/scripts/repo2md.py" > "$repo_root/context/latest.md"
+  # merge the diff into the full snapshot rather than replacing it
+  python "$repo_root/scripts/repo2md.py" --output "$repo_root/context/latest.md" > /dev/null
   git add context/latest.md
   git commit -m "auto snapshot (fswatch)" --no-verify || true
   git push || true
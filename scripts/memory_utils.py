@@ -9,11 +9,31 @@ memories with explicit isolation levels:
     repo+agent+issue    -> <repo>:<agent>:<issue>
 
 Agents should depend on the narrowest level first and broaden on fallback.
+
+Writes are buffered and flushed in size-capped batches by a background
+thread; each item keeps its own metadata.  Mem0 has no bulk add, so against
+Mem0 a batch is still one ``add`` request per item (sent concurrently): the
+cost stays O(items), batching only takes it off the caller's path.  Only the
+local backend writes a batch in one round trip.  ``search`` results are kept
+in a small LRU cache per isolation level.  Set ``MEM0_BACKEND=local`` to use
+the SQLite stand-in backend, which needs no network and is what the tests run
+against.
 """
 from __future__ import annotations
+import asyncio
+import atexit
+import json
+import logging
 import os
+import re
+import sqlite3
 import subprocess
-from typing import Any, Dict, List, Optional
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
 try:
     from mem0 import MemoryClient  # type: ignore
@@ -44,8 +64,167 @@ def _extract_issue_id(branch: str) -> str:
     return "none"
 
 
+# -----------------------------------------------------------------------------
+# backends
+# -----------------------------------------------------------------------------
+
+log = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _payload_size(content: str | List[Dict[str, str]]) -> int:
+    return sum(len(m.get("content", "")) for m in _as_messages(content))
+
+
+def _flush_loop(ref: "weakref.ref[AgentMemory]", wake: threading.Event, closed: threading.Event, interval: float) -> None:
+    # holds only a weak reference so the thread never keeps AgentMemory alive
+    while not closed.is_set():
+        wake.wait(interval)
+        wake.clear()
+        mem = ref()
+        if mem is None:
+            return
+        mem.flush()
+        del mem
+
+
+def _close_at_exit(ref: "weakref.ref[AgentMemory]") -> None:
+    mem = ref()
+    if mem is not None:
+        mem.close()
+
+
+def _as_messages(content: str | List[Dict[str, str]]) -> List[Dict[str, str]]:
+    if isinstance(content, str):
+        return [{"role": "user", "content": content}]
+    return list(content)
+
+
+class LocalMemoryBackend:
+    """Offline stand-in for Mem0 backed by SQLite (``:memory:`` by default).
+
+    Search is naive token overlap, which is enough for tests and local runs.
+    ``round_trips`` counts backend calls so callers can assert batching.
+    """
+
+    def __init__(self, path: str = ":memory:") -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS memories ("
+            " id INTEGER PRIMARY KEY, user_id TEXT, memory TEXT, metadata TEXT)"
+        )
+        self._lock = threading.Lock()
+        self.round_trips = 0
+
+    def add_batch(self, user_id: str, items: List[Tuple[Any, Dict[str, Any]]]) -> int:
+        rows = [
+            (user_id, msg["content"], json.dumps(meta))
+            for content, meta in items
+            for msg in _as_messages(content)
+        ]
+        with self._lock:
+            self.round_trips += 1
+            self._conn.executemany(
+                "INSERT INTO memories (user_id, memory, metadata) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+        return len(items)
+
+    def search(
+        self,
+        query: str,
+        user_id: str,
+        limit: int = 5,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        with self._lock:
+            self.round_trips += 1
+            rows = self._conn.execute(
+                "SELECT id, memory, metadata FROM memories WHERE user_id = ?", (user_id,)
+            ).fetchall()
+        terms = set(_TOKEN_RE.findall(query.lower()))
+        hits = []
+        for row_id, memory, raw_meta in rows:
+            meta = json.loads(raw_meta)
+            if any(meta.get(k) != v for k, v in (filters or {}).items()):
+                continue
+            overlap = len(terms & set(_TOKEN_RE.findall(memory.lower())))
+            if terms and not overlap:
+                continue
+            score = overlap / len(terms) if terms else 0.0
+            hits.append(
+                {"id": str(row_id), "memory": memory, "metadata": meta, "score": score, "user_id": user_id}
+            )
+        hits.sort(key=lambda h: h["score"], reverse=True)
+        return hits[:limit]
+
+
+class MemoryBatchError(RuntimeError):
+    """Some items of a batch were not stored; ``stored`` did succeed.
+
+    ``failed`` holds the metadata of the items that were not stored.
+    """
+
+    def __init__(
+        self, stored: int, errors: List[Exception], failed: Optional[List[Dict[str, Any]]] = None
+    ) -> None:
+        super().__init__(f"{len(errors)} add(s) failed, first: {errors[0]}")
+        self.stored = stored
+        self.errors = errors
+        self.failed = failed or []
+
+
+class _Mem0Backend:
+    """Adapts MemoryClient to the batch interface.
+
+    MemoryClient has no bulk add, so every item stays its own memory (with its
+    own metadata) and a batch is sent as concurrent ``add`` calls: one HTTP
+    request per item, however large the batch.
+    """
+
+    def __init__(self, client: Any, *, concurrency: int = 8) -> None:
+        self.client = client
+        self.concurrency = concurrency
+
+    def add_batch(self, user_id: str, items: List[Tuple[Any, Dict[str, Any]]]) -> int:
+        def add_one(item: Tuple[Any, Dict[str, Any]]) -> Optional[Exception]:
+            content, meta = item
+            try:
+                self.client.add(_as_messages(content), user_id=user_id, metadata=meta)
+            except Exception as exc:
+                return exc
+            return None
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(items))) as pool:
+            outcomes = list(pool.map(add_one, items))
+        errors = [e for e in outcomes if e is not None]
+        if errors:
+            failed = [meta for (_, meta), e in zip(items, outcomes) if e is not None]
+            raise MemoryBatchError(len(items) - len(errors), errors, failed)
+        return len(items)
+
+    def search(self, query: str, user_id: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None):
+        return self.client.search(query, user_id=user_id, limit=limit, filters=filters or {})
+
+
+def _default_backend() -> Any:
+    if os.getenv("MEM0_BACKEND", "").lower() == "local":
+        return LocalMemoryBackend(os.getenv("MEM0_LOCAL_PATH", ":memory:"))
+    if MemoryClient and os.getenv("MEM0_API_KEY"):
+        return _Mem0Backend(MemoryClient())
+    return None
+
+
 class AgentMemory:
-    """Wrapper around Mem0 MemoryClient with contextual isolation."""
+    """Wrapper around Mem0 MemoryClient with contextual isolation.
+
+    ``add`` only enqueues; pending items are flushed when ``batch_size`` items
+    or ``max_batch_bytes`` of content are queued, every ``flush_interval`` seconds (``None`` disables the timer),
+    before a ``search`` on the same isolation level, and on ``close``.
+    Failed adds are logged, not raised; ``failed`` keeps their metadata so
+    callers can retry them.
+    """
 
     def __init__(
         self,
@@ -53,6 +232,13 @@ class AgentMemory:
         repo_name: Optional[str] = None,
         branch: Optional[str] = None,
         issue_id: Optional[str] = None,
+        *,
+        backend: Any = None,
+        batch_size: int = 256,
+        max_batch_bytes: int = 4 * 1024 * 1024,
+        flush_interval: Optional[float] = 2.0,
+        cache_size: int = 256,
+        cache_ttl: float = 300.0,
     ) -> None:
         # fallback values
         self.repo_name = repo_name or os.getenv("REPO_NAME") or os.path.basename(os.getcwd())
@@ -60,7 +246,25 @@ class AgentMemory:
         self.issue_id = issue_id or _extract_issue_id(self.branch)
         self.agent_name = agent_name or os.getenv("AGENT_NAME") or "unknown"
 
-        self.client = MemoryClient() if (MemoryClient and os.getenv("MEM0_API_KEY")) else None
+        self.backend = backend if backend is not None else _default_backend()
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.flush_interval = flush_interval
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.last_error: Optional[Exception] = None
+        self.failed: List[Dict[str, Any]] = []
+
+        self._pending: List[Tuple[str, Any, Dict[str, Any]]] = []
+        self._pending_bytes = 0
+        self._pending_lock = threading.Lock()
+        self._worker_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._cache: "OrderedDict[tuple, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._worker: Optional[threading.Thread] = None
 
     # ------------------------------------------------------------------
     # user_id helpers
@@ -75,6 +279,122 @@ class AgentMemory:
         # default full isolation
         return f"{self.repo_name}:{self.agent_name}:{self.issue_id}"
 
+    # ------------------------------------------------------------------
+    # background flushing
+    # ------------------------------------------------------------------
+    def _ensure_worker(self) -> None:
+        if self.flush_interval is None or self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is not None:
+                return
+            ref = weakref.ref(self)
+            self._worker = threading.Thread(
+                target=_flush_loop,
+                args=(ref, self._wake, self._closed, self.flush_interval),
+                name="agent-memory-flush",
+                daemon=True,
+            )
+            self._worker.start()
+            atexit.register(_close_at_exit, ref)
+
+    def _batches(self, items: List[Tuple[Any, Dict[str, Any]]]):
+        """Split ``items`` into batches capped by count and content size."""
+        batch: List[Tuple[Any, Dict[str, Any]]] = []
+        size = 0
+        for item in items:
+            n = _payload_size(item[0])
+            if batch and (len(batch) >= self.batch_size or size + n > self.max_batch_bytes):
+                yield batch
+                batch, size = [], 0
+            batch.append(item)
+            size += n
+        if batch:
+            yield batch
+
+    def flush(self, user_id: Optional[str] = None) -> int:
+        """Send pending adds (optionally only for ``user_id``); return count sent."""
+        # held across the send so a concurrent caller waits for in-flight items
+        with self._flush_lock:
+            with self._pending_lock:
+                if user_id is None:
+                    batch, self._pending = self._pending, []
+                else:
+                    batch = [p for p in self._pending if p[0] == user_id]
+                    self._pending = [p for p in self._pending if p[0] != user_id]
+                self._pending_bytes = sum(_payload_size(p[1]) for p in self._pending)
+            grouped: Dict[str, List[Tuple[Any, Dict[str, Any]]]] = {}
+            for uid, content, meta in batch:
+                grouped.setdefault(uid, []).append((content, meta))
+            sent = 0
+            for uid, items in grouped.items():
+                for chunk in self._batches(items):
+                    try:
+                        sent += self.backend.add_batch(uid, chunk)
+                    except Exception as exc:  # keep agents running, but say so
+                        sent += getattr(exc, "stored", 0)
+                        if isinstance(exc, MemoryBatchError):
+                            self.failed.extend(exc.failed)
+                        else:
+                            self.failed.extend(meta for _, meta in chunk)
+                        self.last_error = exc
+                        log.warning("mem0 add of %d item(s) for %s failed: %s", len(chunk), uid, exc)
+                self._invalidate(uid)
+        return sent
+
+    def close(self) -> None:
+        """Stop the background flusher and send whatever is still pending."""
+        self._closed.set()
+        self._wake.set()
+        if self._worker is not None and self._worker is not threading.current_thread():
+            self._worker.join()
+        if self.backend:
+            self.flush()
+
+    def __enter__(self) -> "AgentMemory":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        # the flusher only holds a weak reference; stop it and send leftovers
+        try:
+            self._closed.set()
+            self._wake.set()
+            if self._pending and self.backend:
+                self.flush()
+        except Exception:
+            pass
+
+    # ------------------------------------------------------------------
+    # search cache
+    # ------------------------------------------------------------------
+    def _invalidate(self, user_id: str) -> None:
+        with self._cache_lock:
+            for key in [k for k in self._cache if k[0] == user_id]:
+                del self._cache[key]
+
+    def _cache_get(self, key: tuple) -> Optional[List[Dict[str, Any]]]:
+        with self._cache_lock:
+            hit = self._cache.get(key)
+            if hit is None:
+                return None
+            if hit[0] < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return hit[1]
+
+    def _cache_put(self, key: tuple, value: List[Dict[str, Any]]) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic() + self.cache_ttl, value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
     # ------------------------------------------------------------------
     # public API
     # ------------------------------------------------------------------
@@ -84,7 +404,8 @@ class AgentMemory:
         isolation_level: str = "repo+agent+issue",
         metadata: Optional[Dict[str, Any]] = None,
     ) -> bool:
-        if not self.client:
+        """Queue ``content`` for the next batched flush; ``False`` if disabled."""
+        if not self.backend:
             return False
         meta = {
             "repo": self.repo_name,
@@ -93,11 +414,17 @@ class AgentMemory:
             "issue_id": self.issue_id,
             **(metadata or {}),
         }
-        try:
-            self.client.add(content, user_id=self._user_id(isolation_level), metadata=meta)
-            return True
-        except Exception:
-            return False
+        with self._pending_lock:
+            self._pending.append((self._user_id(isolation_level), content, meta))
+            self._pending_bytes += _payload_size(content)
+            full = len(self._pending) >= self.batch_size or self._pending_bytes >= self.max_batch_bytes
+        self._ensure_worker()
+        if full:
+            if self._worker is None:
+                self.flush()
+            else:
+                self._wake.set()
+        return True
 
     def search(
         self,
@@ -106,14 +433,40 @@ class AgentMemory:
         limit: int = 5,
         filters: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
-        if not self.client:
+        if not self.backend:
             return []
+        user_id = self._user_id(isolation_level)
+        # read-your-writes: pending adds for this level go out first
+        self.flush(user_id)
+        key = (user_id, query, limit, json.dumps(filters or {}, sort_keys=True, default=str))
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
         try:
-            return self.client.search(
-                query,
-                user_id=self._user_id(isolation_level),
-                limit=limit,
-                filters=filters or {},
-            )
-        except Exception:
+            results = self.backend.search(query, user_id=user_id, limit=limit, filters=filters or {})
+        except Exception as exc:
+            self.last_error = exc
+            log.warning("mem0 search for %s failed: %s", user_id, exc)
             return []
+        self._cache_put(key, results)
+        return results
+
+    async def aadd(
+        self,
+        content: str | List[Dict[str, str]],
+        isolation_level: str = "repo+agent+issue",
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        return self.add(content, isolation_level, metadata)
+
+    async def asearch(
+        self,
+        query: str,
+        isolation_level: str = "repo+agent+issue",
+        limit: int = 5,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.search, query, isolation_level, limit, filters)
+
+    async def aflush(self) -> int:
+        return await asyncio.to_thread(self.flush)
@@ -1,11 +1,25 @@
 #!/usr/bin/env python3
-"""Walk the repo and emit a single markdown file showing changed source only."""
-import pathlib, sys, hashlib, os
+"""Walk the repo and emit a single markdown file showing changed source only.
+
+A manifest of ``path -> [mtime_ns, size, sha]`` (``context/.repo2md-manifest.json``
+unless ``REPO2MD_MANIFEST`` is set) lets reruns skip unchanged files without
+reading them.  Candidates are hashed in a thread pool and only added, changed
+and deleted files are streamed to stdout.  ``--full`` emits every file.
+
+``--output FILE`` keeps ``FILE`` a full snapshot: the diff is merged into it
+section by section (still streamed, and still echoed to stdout), and its
+manifest lives next to it as ``.FILE.manifest.json`` so the two stay in step.
+"""
+import argparse, hashlib, heapq, io, json, os, pathlib, re, shutil, subprocess, sys, tempfile
+from concurrent.futures import ThreadPoolExecutor
+
 root = pathlib.Path(__file__).resolve().parents[1]
 EXCLUDE = {".git", "context", ".github", ".venv"}
+MAX_SIZE = 50_000  # skip binaries & huge assets
+READ_AHEAD = 64  # candidate files held in memory at once
+HEADER = "<!---- AUTO-GENERATED: do not edit by hand -->"
 
 # --- hierarchical context helpers -------------------------------------------------
-import subprocess, hashlib
 
 def get_repo_context():
     ctx = {
@@ -27,38 +41,207 @@ def get_repo_context():
             ctx["issue_id"] = parts[1]
     return ctx
 
-repo_ctx = get_repo_context()
-
-# Initialize Mem0 via helper
-try:
-    from scripts.memory_utils import AgentMemory  # type: ignore
-    MEMORY = AgentMemory(
-        agent_name="snapshot-bot",
-        repo_name=repo_ctx["repo_name"],
-        branch=repo_ctx["branch"],
-        issue_id=repo_ctx["issue_id"],
-    )
-except Exception:
-    MEMORY = None
-
-print("<!---- AUTO-GENERATED: do not edit by hand -->")
-for path in root.rglob("*.*"):
-    if any(part in EXCLUDE for part in path.parts):
-        continue
-    if path.stat().st_size > 50_000:  # skip binaries & huge assets
-        continue
-    rel = path.relative_to(root)
-    code = path.read_text(errors="ignore")
-    sha  = hashlib.sha1(code.encode()).hexdigest()[:8]
-    # Push to Mem0 if configured
-    if MEMORY:
-        try:
-            # Store code with basic path/sha context if supported
-            MEMORY.add(
-                code,
-                isolation_level="repo+issue",  # snapshot shared per issue
-                metadata={"path": str(rel), "sha": sha},
-            )
-        except Exception:
-            pass
-    print(f"\n## {rel}  \[{sha}]\n```{rel.suffix.lstrip('.')}\n{code}\n```")
+
+def get_memory(repo_ctx):
+    """Initialize Mem0 via helper, or None when unavailable."""
+    try:
+        from scripts.memory_utils import AgentMemory  # type: ignore
+        return AgentMemory(
+            agent_name="snapshot-bot",
+            repo_name=repo_ctx["repo_name"],
+            branch=repo_ctx["branch"],
+            issue_id=repo_ctx["issue_id"],
+            # buffer the snapshot; flushed at the end or each max_batch_bytes.
+            # Mem0 still costs one add request per changed file.
+            batch_size=10_000,
+            flush_interval=None,
+        )
+    except Exception:
+        return None
+
+# --- manifest ---------------------------------------------------------------------
+
+def manifest_path(base, output=None):
+    if os.getenv("REPO2MD_MANIFEST"):
+        return pathlib.Path(os.environ["REPO2MD_MANIFEST"])
+    if output is not None:
+        return output.with_name(f".{output.name}.manifest.json")
+    return base / "context" / ".repo2md-manifest.json"
+
+
+def load_manifest(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path, manifest):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, sort_keys=True, separators=(",", ":")))
+    tmp.replace(path)  # atomic: a crashed run never leaves half a manifest
+
+# --- snapshot ---------------------------------------------------------------------
+
+def iter_files(base):
+    """Yield ``(rel_posix, stat)`` for snapshot-able files, in sorted order."""
+    for dirpath, dirnames, filenames in os.walk(base):
+        dirnames[:] = sorted(d for d in dirnames if d not in EXCLUDE)  # prune, don't descend
+        for name in sorted(filenames):
+            if "." not in name:
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if st.st_size > MAX_SIZE:
+                continue
+            yield pathlib.Path(path).relative_to(base).as_posix(), st
+
+
+def walk_key(rel):
+    """Sort key matching :func:`iter_files` order (a dir's files before its subdirs)."""
+    parts = rel.split("/")
+    return tuple((1, p) for p in parts[:-1]) + ((0, parts[-1]),)
+
+
+def file_sha(data):
+    return hashlib.sha1(data).hexdigest()[:8]
+
+
+def read_file(path):
+    """Return ``(sha, bytes)`` of ``path``, read once, or ``(None, None)`` if unreadable."""
+    try:
+        data = path.read_bytes()  # at most MAX_SIZE
+    except OSError:
+        return None, None
+    return file_sha(data), data
+
+
+def emit(out, rel, sha, code, memory=None):
+    """Write one file section (and queue it for ``memory``)."""
+    if memory:
+        memory.add(
+            code,
+            isolation_level="repo+issue",  # snapshot shared per issue
+            metadata={"path": rel, "sha": sha},
+        )
+    # fence longer than any backtick run, so sections can be parsed back
+    fence = "`" * max(3, max(map(len, re.findall("`+", code)), default=0) + 1)
+    ext = pathlib.PurePosixPath(rel).suffix.lstrip(".")
+    out.write(f"\n## {rel}  \\[{sha}]\n{fence}{ext}\n{code}\n{fence}\n")
+
+
+def snapshot(base, manifest, *, out=sys.stdout, full=False, memory=None, workers=None):
+    """Stream changed files of ``base`` to ``out``; return the new manifest."""
+    new = {}
+    candidates = []
+    for rel, st in iter_files(base):
+        old = manifest.get(rel)
+        if not full and old and old[0] == st.st_mtime_ns and old[1] == st.st_size:
+            new[rel] = old  # unchanged: not even opened
+        else:
+            candidates.append((rel, st.st_mtime_ns, st.st_size))
+
+    changed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(candidates), READ_AHEAD):
+            window = candidates[start : start + READ_AHEAD]
+            for (rel, mtime, size), (sha, data) in zip(
+                window, pool.map(lambda c: read_file(base / c[0]), window)
+            ):
+                if sha is None:
+                    continue  # vanished since the walk: reported as deleted
+                old = manifest.get(rel)
+                new[rel] = [mtime, size, sha]
+                if not full and old and old[2] == sha:
+                    continue  # touched but identical content
+                changed += 1
+                emit(out, rel, sha, data.decode("utf-8", errors="ignore"), memory)
+
+    deleted = sorted(set(manifest) - set(new))
+    for rel in deleted:
+        out.write(f"\n## {rel}  \\[deleted]\n")
+    out.write(f"\n<!-- {changed} changed, {len(deleted)} deleted, {len(new) - changed} unchanged -->\n")
+    return new
+
+
+_SECTION = re.compile(r"## (.+)  \\\[[0-9a-f]{8}\]$")
+
+
+def read_sections(lines):
+    """Yield ``(rel, text)`` for every file section in snapshot ``lines``."""
+    lines = iter(lines)
+    for line in lines:
+        m = _SECTION.match(line.rstrip("\n"))
+        if not m:
+            continue  # header, summary or deleted entry
+        opening = next(lines, "")
+        fence = opening[: len(opening) - len(opening.lstrip("`"))]
+        body = ["\n", line, opening]
+        for line in lines:
+            body.append(line)
+            if line.rstrip("\n") == fence:
+                break
+        yield m.group(1), "".join(body)
+
+
+def merge_snapshot(path, diff, files):
+    """Rewrite the full snapshot at ``path`` with the sections of ``diff``.
+
+    Both are streamed in :func:`walk_key` order; sections of paths not in
+    ``files`` (the new manifest) are dropped.
+    """
+    tmp = path.with_suffix(".tmp")
+    count, last = 0, None
+    prev = open(path, encoding="utf-8") if path.exists() else io.StringIO()
+    with open(tmp, "w", encoding="utf-8") as out, prev:
+        new = ((walk_key(rel), 0, rel, text) for rel, text in read_sections(diff))
+        old = ((walk_key(rel), 1, rel, text) for rel, text in read_sections(prev))
+        out.write(HEADER + "\n")
+        for _, _, rel, text in heapq.merge(new, old):  # a changed section sorts first
+            if rel == last or rel not in files:
+                continue
+            last = rel
+            count += 1
+            out.write(text)
+        out.write(f"\n<!-- {count} files -->\n")
+    tmp.replace(path)  # atomic, like the manifest
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--full", action="store_true", help="emit every file, ignoring the manifest")
+    ap.add_argument("-o", "--output", type=pathlib.Path, help="full snapshot to merge the diff into")
+    args = ap.parse_args(argv)
+
+    memory = get_memory(get_repo_context())
+    mpath = manifest_path(root, args.output)
+    old = load_manifest(mpath)
+    print(HEADER)
+    if args.output is None:
+        manifest = snapshot(root, old, full=args.full, memory=memory)
+        sys.stdout.flush()
+    else:
+        # without the file its manifest is meaningless: rebuild it in full
+        full = args.full or not args.output.exists()
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryFile("w+", encoding="utf-8") as diff:
+            manifest = snapshot(root, old, out=diff, full=full, memory=memory)
+            diff.seek(0)
+            merge_snapshot(args.output, diff, manifest)
+            diff.seek(0)
+            shutil.copyfileobj(diff, sys.stdout)
+    if memory:
+        # send everything before the manifest says it was; failed files stay
+        # out of it so the next run pushes them again
+        memory.close()
+        for meta in memory.failed:
+            manifest.pop(meta.get("path"), None)
+    save_manifest(mpath, manifest)
+
+
+if __name__ == "__main__":
+    main()
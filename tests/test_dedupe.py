@@ -0,0 +1,123 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from loom_autopublisher.dedupe import PublishRegistry
+
+URL = "https://www.loom.com/share/0123456789abcdef0123456789abcdef"
+SAME_ID = "https://www.loom.com/embed/0123456789abcdef0123456789abcdef?t=3"
+
+
+def _pipeline(calls, result=None, delay=0.05):
+    async def run():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return result or {"yt_url": f"https://youtube.com/watch?v={len(calls)}"}
+
+    return run
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_coalesce(tmp_path):
+    reg = PublishRegistry(tmp_path)
+    calls = []
+    a, b = await asyncio.gather(reg.run(URL, _pipeline(calls)), reg.run(SAME_ID, _pipeline(calls)))
+    assert a == b and len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_completed_run_is_reused_unless_forced(tmp_path):
+    calls = []
+    first = await PublishRegistry(tmp_path).run(URL, _pipeline(calls))
+    # a fresh registry (e.g. another process) sees the stored result
+    reg = PublishRegistry(tmp_path)
+    assert reg.get(URL) == first
+    assert await reg.run(URL, _pipeline(calls)) == first
+    assert len(calls) == 1
+
+    again = await reg.run(URL, _pipeline(calls), force=True)
+    assert len(calls) == 2 and again != first
+
+
+@pytest.mark.asyncio
+async def test_cross_process_waiter_uses_result(tmp_path):
+    calls = []
+    one = PublishRegistry(tmp_path, poll_interval=0.01)
+    two = PublishRegistry(tmp_path, poll_interval=0.01)
+    a, b = await asyncio.gather(
+        one.run(URL, _pipeline(calls, delay=0.1)),
+        two.run(URL, _pipeline(calls), force=True),
+    )
+    assert a == b and len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_failure_is_not_stored(tmp_path):
+    reg = PublishRegistry(tmp_path)
+
+    async def boom():
+        raise RuntimeError("upload failed")
+
+    with pytest.raises(RuntimeError):
+        await reg.run(URL, boom)
+    assert reg.get(URL) is None
+    calls = []
+    await reg.run(URL, _pipeline(calls))
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_others(tmp_path):
+    reg = PublishRegistry(tmp_path)
+    calls = []
+    a = asyncio.ensure_future(reg.run(URL, _pipeline(calls, delay=0.05)))
+    b = asyncio.ensure_future(reg.run(URL, _pipeline(calls)))
+    await asyncio.sleep(0.01)
+    a.cancel()
+    result = await b
+    assert a.cancelled() and len(calls) == 1
+    assert reg.get(URL) == result
+
+
+@pytest.mark.asyncio
+async def test_last_caller_leaving_cancels_run(tmp_path):
+    reg = PublishRegistry(tmp_path)
+    calls = []
+    a = asyncio.ensure_future(reg.run(URL, _pipeline(calls, delay=10)))
+    await asyncio.sleep(0.01)
+    a.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await a
+    await asyncio.sleep(0)
+    assert reg._inflight == {} and reg.get(URL) is None
+
+
+@pytest.mark.asyncio
+async def test_new_caller_does_not_join_cancelled_run(tmp_path):
+    reg = PublishRegistry(tmp_path, poll_interval=0.01)
+    calls = []
+    a = asyncio.ensure_future(reg.run(URL, _pipeline(calls, delay=10)))
+    await asyncio.sleep(0.01)
+    a.cancel()
+    await asyncio.sleep(0)  # A has left; its run is cancelled but not yet done
+    result = await reg.run(URL, _pipeline(calls, result={"yt_url": "fresh"}))
+    assert result == {"yt_url": "fresh"} and len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_store_failure_does_not_fail_or_repeat_publish(tmp_path, monkeypatch):
+    calls = []
+    reg = PublishRegistry(tmp_path)
+    # not JSON-native: stored as str() instead of raising after publishing
+    first = await reg.run(URL, _pipeline(calls, result={"yt_url": "u", "tags": {"a"}}))
+    assert first["tags"] == {"a"}
+    assert PublishRegistry(tmp_path).get(URL) == {"yt_url": "u", "tags": "{'a'}"}
+
+    def disk_full(self, target):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(Path, "replace", disk_full)
+    again = await reg.run(URL, _pipeline(calls), force=True)
+    assert len(calls) == 2 and list(tmp_path.glob("*.tmp")) == []
+    assert await reg.run(SAME_ID, _pipeline(calls)) == again and len(calls) == 2
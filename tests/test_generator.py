@@ -1,5 +1,6 @@
 import asyncio
 import json
+import time
 from pathlib import Path
 
 import pytest
@@ -39,3 +40,158 @@ async def test_generate_content(monkeypatch, tmp_path: Path):
     out = await gen.generate_content(transcript, brand_css_path=css_file)
     assert out["slug"].startswith("cool-")
     assert "<div" in out["walkthrough_html"]
+
+
+@pytest.mark.asyncio
+async def test_generate_content_chunks_oversized_transcript(monkeypatch):
+    dummy_json = json.dumps(
+        {
+            "title": "T",
+            "description": "D",
+            "teaser": "Teaser",
+            "slug": "t",
+            "walkthrough_html": "<div>x</div>",
+        }
+    )
+    calls = []
+
+    def fake_create(*a, **k):
+        calls.append(k)
+        if "response_format" in k:
+            return DummyRsp(dummy_json)
+        return DummyRsp("condensed")
+
+    monkeypatch.setattr("openai.ChatCompletion.create", fake_create)
+    monkeypatch.setattr(gen, "_MAX_PROMPT_TOKENS", 1500)
+
+    transcript = "".join(f"Step {i}: click the button and wait.\n" for i in range(300))
+    out = await gen.generate_content(transcript)
+    assert out["slug"] == "t"
+    condense_calls = [c for c in calls if "response_format" not in c]
+    assert len(condense_calls) > 1
+    # every chunk gets an equal share of the remaining prompt budget
+    assert sum(c["max_tokens"] for c in condense_calls) < 1500
+    final = calls[-1]["messages"][-1]["content"]
+    assert "condensed" in final and "Step 299" not in final
+
+
+@pytest.mark.asyncio
+async def test_condense_respects_completion_cap(monkeypatch):
+    dummy_json = json.dumps(
+        {"title": "T", "description": "D", "teaser": "T", "slug": "t", "walkthrough_html": "<p/>"}
+    )
+    calls = []
+
+    def fake_create(*a, **k):
+        calls.append(k)
+        return DummyRsp(dummy_json if "response_format" in k else "condensed")
+
+    monkeypatch.setattr("openai.ChatCompletion.create", fake_create)
+    monkeypatch.setattr(gen, "_MAX_PROMPT_TOKENS", 100000)
+    monkeypatch.setattr(gen, "_MAX_COMPLETION_TOKENS", 16384)
+
+    # ~114k tokens: just over the default prompt budget
+    line = "Now we open the settings page and enable the preview option.\n"
+    transcript = line * (114000 * 4 // len(line))
+    await gen.generate_content(transcript)
+    condense_calls = [c for c in calls if "response_format" not in c]
+    assert len(condense_calls) >= 7
+    assert all(c["max_tokens"] <= 16384 for c in condense_calls)
+    assert all(gen.count_message_tokens(c["messages"]) <= 100000 for c in condense_calls)
+
+@pytest.mark.asyncio
+async def test_generate_variants_single_call(monkeypatch):
+    dummy_json = json.dumps(
+        {
+            "variants": [
+                {"title": "Video", "teaser": "Video."},
+                {"title": "Deploy Netlify previews in minutes", "teaser": "Set up Netlify deploy previews for every branch."},
+                {"title": "x" * 80, "teaser": "Too long title is dropped."},
+            ],
+            "description": "How to deploy previews.",
+            "slug": "netlify-previews",
+            "walkthrough_html": "<div>hi</div>",
+        }
+    )
+    calls = []
+
+    def fake_create(*a, **k):
+        calls.append(k)
+        return DummyRsp(dummy_json)
+
+    monkeypatch.setattr("openai.ChatCompletion.create", fake_create)
+
+    transcript = "Today we deploy Netlify previews. Netlify deploy previews run per branch. " * 5
+    out = await gen.generate_variants(transcript, n=3)
+    assert len(calls) == 1
+    assert [v["title"] for v in out["variants"]] == [
+        "Deploy Netlify previews in minutes",
+        "Video",
+    ]
+    assert out["title"] == "Deploy Netlify previews in minutes"
+    assert out["walkthrough_html"] == "<div>hi</div>"
+
+
+@pytest.mark.asyncio
+async def test_generate_variants_counts_variants_message(monkeypatch):
+    dummy_json = json.dumps(
+        {
+            "variants": [{"title": "Deploy previews", "teaser": "Per branch."}],
+            "description": "D",
+            "slug": "d",
+            "walkthrough_html": "<p/>",
+        }
+    )
+    calls = []
+
+    def fake_create(*a, **k):
+        calls.append(k)
+        return DummyRsp(dummy_json if "response_format" in k else "condensed")
+
+    monkeypatch.setattr("openai.ChatCompletion.create", fake_create)
+    transcript = "".join(f"Step {i}: click the button and wait.\n" for i in range(300))
+    base = gen.build_messages(
+        transcript,
+        system_prompt=gen._VARIANT_PROMPT,
+        schema=gen._VARIANT_SCHEMA,
+        brand_css=gen.compact_brand_css(None),
+    )
+    # fits only without the trailing VARIANTS message
+    budget = gen.count_message_tokens(base)
+    monkeypatch.setattr(gen, "_MAX_PROMPT_TOKENS", budget)
+
+    await gen.generate_variants(transcript, n=3)
+    final = calls[-1]["messages"]
+    assert len(calls) > 1 and final[-1]["content"] == "VARIANTS: 3"
+    assert gen.count_message_tokens(final) <= budget
+
+@pytest.mark.asyncio
+async def test_generate_content_oversized_fails_before_api(monkeypatch):
+    active = peak = 0
+    calls = []
+
+    def echo_create(*a, **k):
+        # a condenser that does not shrink anything
+        nonlocal active, peak
+        calls.append(k)
+        active += 1
+        peak = max(peak, active)
+        time.sleep(0.01)
+        active -= 1
+        return DummyRsp(k["messages"][-1]["content"])
+
+    monkeypatch.setattr("openai.ChatCompletion.create", echo_create)
+    transcript = "".join(f"Step {i}: click the button and wait.\n" for i in range(300))
+
+    # prefix alone over budget: no LLM call at all
+    monkeypatch.setattr(gen, "_MAX_PROMPT_TOKENS", 50)
+    with pytest.raises(ValueError, match="prefix"):
+        await gen.generate_content(transcript)
+    assert calls == []
+
+    monkeypatch.setattr(gen, "_MAX_PROMPT_TOKENS", 1500)
+    monkeypatch.setattr(gen, "_CONDENSE_CONCURRENCY", 2)
+    with pytest.raises(ValueError, match="after condensing"):
+        await gen.generate_content(transcript)
+    assert calls and all("response_format" not in c for c in calls)
+    assert peak <= 2
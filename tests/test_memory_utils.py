@@ -0,0 +1,124 @@
+import asyncio
+import gc
+import threading
+import time
+import weakref
+
+from scripts.memory_utils import AgentMemory, LocalMemoryBackend, _Mem0Backend
+
+
+def _memory(backend, **kw):
+    return AgentMemory(
+        agent_name="bot", repo_name="repo", branch="feat/ISSUE-7-x", backend=backend, **kw
+    )
+
+
+def test_add_is_batched_into_one_round_trip():
+    backend = LocalMemoryBackend()
+    mem = _memory(backend, flush_interval=None, batch_size=1000)
+    for i in range(300):
+        assert mem.add(f"file {i}", isolation_level="repo+issue", metadata={"path": f"f{i}.py"})
+    assert backend.round_trips == 0
+    mem.close()
+    assert backend.round_trips == 1
+    hits = mem.search("file 42", isolation_level="repo+issue", limit=300)
+    assert any(h["metadata"]["path"] == "f42.py" for h in hits)
+
+
+def test_background_flush_and_search_cache():
+    backend = LocalMemoryBackend()
+    with _memory(backend, flush_interval=0.01) as mem:
+        mem.add("deploy previews on netlify")
+        hits = mem.search("netlify")
+        assert hits and hits[0]["memory"] == "deploy previews on netlify"
+        trips = backend.round_trips
+        assert mem.search("netlify") == hits
+        assert backend.round_trips == trips  # served from cache
+
+        # a new add to the same level invalidates the cached result
+        mem.add("netlify build hooks")
+        assert len(mem.search("netlify")) == 2
+        # other isolation levels are cached separately
+        assert mem.search("netlify", isolation_level="repo") == []
+
+
+def test_search_errors_are_recorded(caplog):
+    class Broken(LocalMemoryBackend):
+        def search(self, *a, **k):
+            raise RuntimeError("boom")
+
+    mem = _memory(Broken(), flush_interval=None)
+    assert mem.search("x") == []
+    assert str(mem.last_error) == "boom"
+    assert "boom" in caplog.text
+
+
+def test_async_api():
+    async def run():
+        mem = _memory(LocalMemoryBackend(), flush_interval=None)
+        await mem.aadd("async memory")
+        assert await mem.aflush() == 1
+        return await mem.asearch("async")
+
+    assert asyncio.run(run())[0]["memory"] == "async memory"
+
+
+def test_disabled_without_backend(monkeypatch):
+    monkeypatch.delenv("MEM0_API_KEY", raising=False)
+    monkeypatch.delenv("MEM0_BACKEND", raising=False)
+    mem = AgentMemory(agent_name="bot", repo_name="repo", branch="main")
+    assert mem.add("x") is False
+    assert mem.search("x") == []
+
+
+class _FakeMem0Client:
+    def __init__(self):
+        self.calls = []
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    def add(self, messages, user_id, metadata):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.005)
+        with self.lock:
+            self.active -= 1
+            self.calls.append((messages, user_id, metadata))
+        if metadata.get("path") == "bad.py":
+            raise RuntimeError("rejected")
+
+
+def test_mem0_backend_keeps_per_item_metadata():
+    client = _FakeMem0Client()
+    mem = _memory(_Mem0Backend(client, concurrency=3), flush_interval=None, batch_size=1000)
+    for name in ("a.py", "b.py", "bad.py", "c.py"):
+        mem.add(f"code of {name}", isolation_level="repo+issue", metadata={"path": name})
+    assert mem.flush() == 3
+    assert "rejected" in str(mem.last_error)
+    assert [meta["path"] for meta in mem.failed] == ["bad.py"]
+    assert len(client.calls) == 4 and client.peak <= 3
+    by_path = {meta["path"]: msgs for msgs, _, meta in client.calls}
+    assert by_path["a.py"] == [{"role": "user", "content": "code of a.py"}]
+
+
+def test_batches_are_capped_by_size():
+    backend = LocalMemoryBackend()
+    mem = _memory(backend, flush_interval=None, batch_size=1000, max_batch_bytes=100)
+    for i in range(5):
+        mem.add("x" * 60, isolation_level="repo")
+    # every second add crosses the cap and flushes synchronously
+    mem.close()
+    assert backend.round_trips == 5
+
+
+def test_background_worker_does_not_keep_memory_alive():
+    mem = _memory(LocalMemoryBackend(), flush_interval=0.01)
+    mem.add("x")
+    worker = mem._worker
+    ref = weakref.ref(mem)
+    del mem
+    gc.collect()
+    assert ref() is None
+    worker.join(1)
+    assert not worker.is_alive()
@@ -0,0 +1,75 @@
+import asyncio
+import json
+import tracemalloc
+
+import pytest
+
+from loom_autopublisher.profiling import RunProfiler, format_report, main
+
+
+def test_disabled_is_noop(tmp_path, monkeypatch):
+    monkeypatch.delenv("LOOM_PROFILE", raising=False)
+    prof = RunProfiler("r1", report_dir=tmp_path)
+    with prof.stage("fetch_assets"):
+        pass
+    prof.record_io("loom", downloaded=10)
+    assert prof.stages == [] and prof.io == {}
+    assert prof.httpx_event_hooks("loom") == {}
+    assert prof.write_report() is None
+
+
+def test_report_stages_io_and_detail(tmp_path, capsys):
+    prof = RunProfiler("r2", enabled=True, detail="tracemalloc", report_dir=tmp_path)
+    with prof.stage("fetch_assets"):
+        blob = bytearray(2_000_000)  # whole-video style buffering
+    with prof.stage("generate_content"):
+        pass
+    with pytest.raises(RuntimeError):
+        with prof.stage("upload_video"):
+            raise RuntimeError("boom")
+    prof.record_io("loom", downloaded=len(blob))
+    prof.record_io("youtube", uploaded=123)
+
+    path = prof.write_report()
+    report = json.loads(path.read_text())
+    assert [s["stage"] for s in report["stages"]] == ["fetch_assets", "generate_content", "upload_video"]
+    assert report["stages"][2]["ok"] is False
+    assert report["io"]["loom"] == {"downloaded": 2_000_000, "uploaded": 0}
+    assert report["slowest"]["detail"] == "tracemalloc"
+    assert "test_profiling.py" in report["slowest"]["text"]
+
+    text = format_report(report)
+    assert "fetch_assets" in text and "io youtube" in text
+    assert main([str(path)]) == 0
+    assert "run r2" in capsys.readouterr().out
+
+
+@pytest.mark.asyncio
+async def test_httpx_hooks_count_bytes(tmp_path):
+    prof = RunProfiler("r3", enabled=True, report_dir=tmp_path)
+    hooks = prof.httpx_event_hooks("loom")
+    req = type("R", (), {"headers": {"content-length": "5"}})()
+    rsp = type("R", (), {"headers": {"content-length": "42"}})()
+    await hooks["request"][0](req)
+    await hooks["response"][0](rsp)
+    assert prof.io["loom"] == {"downloaded": 42, "uploaded": 5}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("detail", ["tracemalloc", "cprofile"])
+async def test_concurrent_runs_share_detail_capture(tmp_path, detail):
+    async def run(run_id, hold):
+        prof = RunProfiler(run_id, enabled=True, detail=detail, report_dir=tmp_path)
+        with prof.stage("generate_content"):
+            await asyncio.sleep(hold)
+        return prof
+
+    # the first run finishes (and stops its capture) while the second is still inside
+    a, b = await asyncio.gather(run("a", 0.01), run("b", 0.05))
+    assert [s["ok"] for s in a.stages + b.stages] == [True, True]
+    assert (a.slowest is None) != (b.slowest is None)  # exactly one captured detail
+    assert not tracemalloc.is_tracing()
+
+    # the next stage can capture again once the lock is free
+    c = await run("c", 0)
+    assert c.slowest["detail"] == detail
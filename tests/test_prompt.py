@@ -0,0 +1,54 @@
+import os
+from pathlib import Path
+
+from loom_autopublisher import prompt
+
+
+def test_compact_brand_css_keeps_relevant_vars(tmp_path: Path):
+    css_file = tmp_path / "variables.css"
+    css_file.write_text(
+        "/* palette */\n"
+        ":root {\n"
+        "  --brand-primary: #123456;\n"
+        "  --font-body:  Inter, sans-serif;\n"
+        "  --z-modal: 1000;\n"
+        "}\n"
+    )
+    out = prompt.compact_brand_css(css_file)
+    assert out == ":root{--brand-primary:#123456;--font-body:Inter, sans-serif}"
+
+
+def test_compact_brand_css_cached_by_mtime(tmp_path: Path, monkeypatch):
+    css_file = tmp_path / "variables.css"
+    css_file.write_text(":root { --color-bg: #fff; }")
+    first = prompt.compact_brand_css(css_file)
+
+    reads = []
+    orig = Path.read_text
+    monkeypatch.setattr(Path, "read_text", lambda self, *a, **k: reads.append(self) or orig(self, *a, **k))
+    assert prompt.compact_brand_css(css_file) == first
+    assert reads == []
+
+    css_file.write_text(":root { --color-bg: #000000; }")
+    os.utime(css_file, ns=(0, css_file.stat().st_mtime_ns + 1_000_000))
+    assert "#000000" in prompt.compact_brand_css(css_file)
+
+
+def test_compact_brand_css_missing(tmp_path: Path):
+    assert prompt.compact_brand_css(None) == "/* brand CSS not found */"
+    assert prompt.compact_brand_css(tmp_path / "nope.css") == "/* brand CSS not found */"
+
+
+def test_build_messages_stable_prefix():
+    a = prompt.build_messages("one", system_prompt="S", schema="{}", brand_css=":root{}")
+    b = prompt.build_messages("two", system_prompt="S", schema="{}", brand_css=":root{}")
+    assert a[:-1] == b[:-1]
+    assert a[-1]["content"].endswith("one")
+
+
+def test_split_by_tokens_respects_budget():
+    text = "".join(f"line number {i}\n" for i in range(200))
+    chunks = prompt.split_by_tokens(text, 50)
+    assert len(chunks) > 1
+    assert "".join(chunks) == text
+    assert all(prompt.count_tokens(c) <= 50 for c in chunks)
@@ -0,0 +1,113 @@
+import io
+import json
+
+from scripts import repo2md
+from scripts.memory_utils import AgentMemory, MemoryBatchError
+
+
+def _run(base, manifest, **kw):
+    out = io.StringIO()
+    new = repo2md.snapshot(base, manifest, out=out, **kw)
+    return new, out.getvalue()
+
+
+def test_snapshot_emits_only_changes(tmp_path, monkeypatch):
+    (tmp_path / "a.py").write_text("print('a')\n")
+    (tmp_path / "b.md").write_text("# b\n")
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "x.txt").write_text("ignored")
+
+    manifest, text = _run(tmp_path, {})
+    assert set(manifest) == {"a.py", "b.md"}
+    assert "## a.py" in text and "## b.md" in text and "x.txt" not in text
+
+    # unchanged files are not read at all on rerun
+    opened = []
+    monkeypatch.setattr(repo2md, "read_file", lambda p: opened.append(p) or ("x", b""))
+    manifest2, text = _run(tmp_path, manifest)
+    assert manifest2 == manifest and opened == []
+    assert "## " not in text
+    monkeypatch.undo()
+
+    (tmp_path / "a.py").write_text("print('changed')\n")
+    (tmp_path / "b.md").unlink()
+    (tmp_path / "c.txt").write_text("new")
+    _, text = _run(tmp_path, manifest)
+    assert "## a.py" in text and "changed" in text
+    assert "## c.txt" in text
+    assert "## b.md  \\[deleted]" in text
+
+
+def test_snapshot_touched_but_identical(tmp_path):
+    f = tmp_path / "a.py"
+    f.write_text("same\n")
+    manifest, _ = _run(tmp_path, {})
+    manifest["a.py"][0] -= 1  # simulate an mtime bump without content change
+    new, text = _run(tmp_path, manifest)
+    assert "## a.py" not in text
+    assert new["a.py"][2] == manifest["a.py"][2]
+
+    _, text = _run(tmp_path, new, full=True)
+    assert "## a.py" in text
+
+
+def test_manifest_roundtrip(tmp_path):
+    path = tmp_path / "ctx" / "m.json"
+    assert repo2md.load_manifest(path) == {}
+    repo2md.save_manifest(path, {"a": [1, 2, "abc"]})
+    assert repo2md.load_manifest(path) == {"a": [1, 2, "abc"]}
+
+
+def test_output_keeps_full_snapshot(tmp_path, monkeypatch, capsys):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("x = '```'\n")
+    (repo / "b.md").write_text("## fake.py  \\[deadbeef]\n")
+    monkeypatch.setattr(repo2md, "root", repo)
+    monkeypatch.setattr(repo2md, "get_memory", lambda ctx: None)
+    monkeypatch.delenv("REPO2MD_MANIFEST", raising=False)
+    latest = tmp_path / "context" / "latest.md"
+
+    repo2md.main(["--output", str(latest)])
+    full = latest.read_text()
+    assert "## a.py" in full and "## b.md" in full
+    assert json.loads((latest.parent / ".latest.md.manifest.json").read_text()).keys() == {"a.py", "b.md"}
+
+    # a no-op rerun leaves the full snapshot alone and prints an empty diff
+    capsys.readouterr()
+    repo2md.main(["--output", str(latest)])
+    assert latest.read_text() == full
+    assert "## " not in capsys.readouterr().out
+
+    (repo / "a.py").write_text("y = 2\n")
+    (repo / "b.md").unlink()
+    (repo / "c.py").write_text("c\n")
+    repo2md.main(["--output", str(latest)])
+    text = latest.read_text()
+    assert "y = 2" in text and "## a.py" in text and "## c.py" in text and "## b.md" not in text
+    assert "x = " not in text and text.index("## a.py") < text.index("## c.py")
+
+
+def test_failed_memory_adds_are_retried(tmp_path, monkeypatch):
+    class RejectBad:
+        def add_batch(self, user_id, items):
+            failed = [meta for _, meta in items if meta["path"] == "bad.py"]
+            if failed:
+                raise MemoryBatchError(len(items) - len(failed), [RuntimeError("no")], failed)
+            return len(items)
+
+    reads = []
+    read_file = repo2md.read_file
+    monkeypatch.setattr(repo2md, "read_file", lambda p: reads.append(p.name) or read_file(p))
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "ok.py").write_text("ok\n")
+    (repo / "bad.py").write_text("bad\n")
+    mem = AgentMemory("a", "r", "main", backend=RejectBad(), flush_interval=None)
+    monkeypatch.setattr(repo2md, "root", repo)
+    monkeypatch.setattr(repo2md, "get_memory", lambda ctx: mem)
+    monkeypatch.setenv("REPO2MD_MANIFEST", str(tmp_path / "m.json"))
+
+    repo2md.main([])
+    assert sorted(reads) == ["bad.py", "ok.py"]  # each file read once
+    assert set(repo2md.load_manifest(tmp_path / "m.json")) == {"ok.py"}
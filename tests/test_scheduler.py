@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+from loom_autopublisher.scheduler import BACKFILL, Scheduler
+
+
+@pytest.mark.asyncio
+async def test_stage_cap_is_respected(monkeypatch):
+    monkeypatch.delenv("LOOM_CAP_UPLOAD_VIDEO", raising=False)
+    sched = Scheduler({"upload_video": 2})
+    active = peak = 0
+
+    async def upload(i):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return i
+
+    out = await asyncio.gather(*(sched.submit("upload_video", upload, i) for i in range(6)))
+    assert out == list(range(6)) and peak == 2
+    assert sched.stats()["upload_video"]["running"] == 0
+
+
+@pytest.mark.asyncio
+async def test_interactive_jumps_backfill_and_tenants_share():
+    sched = Scheduler({"generate_content": 1})
+    order = []
+    gate = asyncio.Event()
+
+    async def work(tag):
+        if tag == "first":
+            await gate.wait()
+        order.append(tag)
+
+    first = asyncio.ensure_future(sched.submit("generate_content", work, "first", lane=BACKFILL, tenant="a"))
+    await asyncio.sleep(0)
+    jobs = [
+        sched.submit("generate_content", work, f"{t}{i}", lane=BACKFILL, tenant=t)
+        for t in ("a", "b")
+        for i in range(2)
+    ]
+    jobs = [asyncio.ensure_future(j) for j in jobs]
+    await asyncio.sleep(0)
+    ui = asyncio.ensure_future(sched.submit("generate_content", work, "ui"))
+    await asyncio.sleep(0)
+    assert sched.stats()["generate_content"] == {
+        "cap": 1,
+        "backfill_cap": 1,
+        "running": 1,
+        "interactive": 1,
+        "backfill": 4,
+    }
+
+    gate.set()
+    await asyncio.gather(first, ui, *jobs)
+    assert order == ["first", "ui", "a0", "b0", "a1", "b1"]
+
+
+@pytest.mark.asyncio
+async def test_errors_and_cancellation_free_the_slot():
+    sched = Scheduler({"generate_intro": 1})
+
+    async def boom():
+        raise RuntimeError("quota")
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    async def ok():
+        return "done"
+
+    with pytest.raises(RuntimeError):
+        await sched.submit("generate_intro", boom)
+    task = asyncio.ensure_future(sched.submit("generate_intro", slow))
+    await asyncio.sleep(0)
+    task.cancel()
+    assert await asyncio.wait_for(sched.submit("generate_intro", ok), 1) == "done"
+
+
+def test_env_cap_override(monkeypatch):
+    monkeypatch.setenv("LOOM_CAP_GENERATE_CONTENT", "7")
+    assert Scheduler().cap("generate_content") == 7
+    assert Scheduler(default_cap=3).cap("publish_walkthrough") == 3
+
+
+@pytest.mark.asyncio
+async def test_interactive_slot_reserved_under_saturating_backfill(monkeypatch):
+    monkeypatch.delenv("LOOM_CAP_UPLOAD_VIDEO", raising=False)
+    monkeypatch.delenv("LOOM_BACKFILL_CAP_UPLOAD_VIDEO", raising=False)
+    sched = Scheduler({"upload_video": 2})
+    release = asyncio.Event()
+
+    async def long_upload():
+        await release.wait()
+
+    async def quick_upload():
+        return "interactive done"
+
+    backfill = [
+        asyncio.ensure_future(sched.submit("upload_video", long_upload, lane=BACKFILL, tenant="batch"))
+        for _ in range(10)
+    ]
+    await asyncio.sleep(0)
+    stats = sched.stats()["upload_video"]
+    assert stats["running"] == 1 and stats["backfill"] == 9  # one slot held back
+
+    # interactive runs immediately although backfill is saturating its share
+    assert await asyncio.wait_for(sched.submit("upload_video", quick_upload), 1) == "interactive done"
+
+    release.set()
+    await asyncio.gather(*backfill)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_queued_jobs_leave_the_queue():
+    sched = Scheduler({"generate_intro": 1})
+    gate = asyncio.Event()
+
+    async def work():
+        await gate.wait()
+
+    running = asyncio.ensure_future(sched.submit("generate_intro", work))
+    queued = [
+        asyncio.ensure_future(sched.submit("generate_intro", work, lane=BACKFILL, tenant=t))
+        for t in ("a", "b")
+    ]
+    await asyncio.sleep(0)
+    assert sched.stats()["generate_intro"]["backfill"] == 2
+    for q in queued:
+        q.cancel()
+    await asyncio.sleep(0)
+    assert sched.stats()["generate_intro"]["backfill"] == 0
+    gate.set()
+    await running
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from loom_autopublisher import social
+from loom_autopublisher.buffer import BufferError
+from loom_autopublisher.social import MediaInfo, build_caption, check_media, fan_out
+
+SHORT = MediaInfo(duration=15, width=1080, height=1920, size=8_000_000)
+
+
+def test_build_caption_per_platform():
+    teaser = "Ship Netlify previews for every branch in minutes " * 10
+    x = build_caption("x", teaser=teaser, netlify_url="https://site.dev/p.html")
+    assert len(x) + len(" ▶ ") + 23 <= 280
+    assert x.endswith("…")
+
+    tt = build_caption("tiktok", teaser="Quick tour", netlify_url="https://n", slug="netlify-deploy-previews")
+    assert tt == "Quick tour\n\n#netlify #deploy #previews"
+
+    li = build_caption(
+        "linkedin", teaser="Quick tour", netlify_url="https://n", description="First para.\n\nSecond."
+    )
+    assert li == "Quick tour\n\nFirst para."
+
+
+def test_check_media():
+    assert check_media("tiktok", SHORT) == []
+    wide = MediaInfo(duration=120, width=1920, height=1080, size=1)
+    problems = check_media("instagram", wide)
+    assert any("duration" in p for p in problems) and any("aspect" in p for p in problems)
+    assert check_media("x", wide) == []
+
+
+@pytest.mark.asyncio
+async def test_fan_out_isolates_failures(monkeypatch):
+    sent = []
+
+    async def fake_queue_post(*, text, netlify_url, remote_video_url, profiles, dry_run):
+        sent.append(profiles[0])
+        if profiles[0] == "li":
+            raise BufferError("Buffer API returned 400")
+        return f"u-{profiles[0]}"
+
+    monkeypatch.setattr(social, "queue_post", fake_queue_post)
+    long_short = MediaInfo(duration=100, width=1080, height=1920, size=8_000_000)
+
+    out = await fan_out(
+        {"tt": "tiktok", "ig": "instagram", "x1": "X", "li": "linkedin", "mx": "myspace"},
+        teaser="Quick tour",
+        netlify_url="https://n",
+        remote_video_url="https://v",
+        media=long_short,
+    )
+    assert out["tt"].ok and out["tt"].update_id == "u-tt"
+    assert out["x1"].ok
+    assert "duration" in out["ig"].error  # Reels max 90s, never sent
+    assert out["li"].error == "BufferError: Buffer API returned 400"
+    assert "unknown platform" in out["mx"].error
+    assert sorted(sent) == ["li", "tt", "x1"]
+
+    # a video nobody measured is not posted blind
+    sent.clear()
+    out = await fan_out({"tt": "tiktok"}, teaser="t", netlify_url="https://n", remote_video_url="https://v")
+    assert "media unknown" in out["tt"].error and sent == []
+
+
+@pytest.mark.asyncio
+async def test_fan_out_dry_run(monkeypatch):
+    monkeypatch.delenv("BUFFER_ACCESS_TOKEN", raising=False)
+    out = await fan_out({"p": "tiktok"}, teaser="t", netlify_url="https://n", media=SHORT)
+    assert out["p"].update_id.startswith("dry-")
+
+
+@pytest.mark.asyncio
+async def test_fan_out_survives_unexpected_errors(monkeypatch):
+    async def fake_queue_post(*, profiles, **kw):
+        if profiles[0] == "x1":
+            raise json.JSONDecodeError("Expecting value", "", 0)
+        return f"u-{profiles[0]}"
+
+    monkeypatch.setattr(social, "queue_post", fake_queue_post)
+    out = await fan_out({"tt": "tiktok", "x1": "x"}, teaser="t", netlify_url="https://n")
+    assert out["tt"].update_id == "u-tt"
+    assert out["x1"].error.startswith("JSONDecodeError")
+
+    # a link that leaves no room for a caption is reported, not truncated to garbage
+    with pytest.raises(ValueError, match="link too long"):
+        build_caption("linkedin", teaser="t", netlify_url="https://n/" + "a" * 3000)
+    out = await fan_out({"li": "linkedin"}, teaser="t", netlify_url="https://n/" + "a" * 3000)
+    assert "link too long" in out["li"].error